@@ -0,0 +1,159 @@
+import numpy as np
+
+import cache
+import db
+
+MAX_CHART_POINTS = 1500                      # most points a trend chart is sent
+HISTORY_CACHE_BYTES = 128 * 1024 * 1024      # loaded histories kept across reruns
+ROLLING_WINDOWS = {'daily': 7, 'weekly': 4, 'monthly': 3}
+_EPOCH_MONTH = 1970 * 12
+
+# A user's whole expense history as parallel NumPy arrays, sorted by day:
+# `days` (days since 1970-01-01), `cents`, `months` (months since 1970-01) and
+# `codes` (index into `categories`). Goals are `goal_months` and `goal_cents`.
+# Ranges are half-open [start, end) day or month numbers.
+class History:
+    def __init__(self, days, cents, codes, categories, goal_months, goal_cents):
+        self.days = days
+        self.cents = cents
+        self.codes = codes
+        self.categories = categories
+        self.months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+        self.goal_months = goal_months
+        self.goal_cents = goal_cents
+
+    @property
+    def empty(self):
+        return len(self.days) == 0
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.days, self.cents, self.codes, self.months,
+                                              self.goal_months, self.goal_cents))
+
+    def _span(self, start, end):
+        return np.searchsorted(self.days, start), np.searchsorted(self.days, end)
+
+    # Spending per day, week (starting Monday) or month over a range; returns
+    # (period numbers, cents). Day 0 was a Thursday, so week w starts on day 7w - 3.
+    def daily(self, start, end):
+        lo, hi = self._span(start, end)
+        return np.arange(start, end), np.bincount(self.days[lo:hi] - start, self.cents[lo:hi], end - start)
+
+    def weekly(self, start, end):
+        lo, hi = self._span(start, end)
+        first, last = (start + 3) // 7, (end + 2) // 7 + 1
+        weeks = (self.days[lo:hi] + 3) // 7 - first
+        return np.arange(first, last) * 7 - 3, np.bincount(weeks, self.cents[lo:hi], last - first)
+
+    def monthly(self, start_month, end_month):
+        mask = (self.months >= start_month) & (self.months < end_month)
+        return (np.arange(start_month, end_month),
+                np.bincount(self.months[mask] - start_month, self.cents[mask], end_month - start_month))
+
+    # Cents per category (aligned with self.categories) over a day range
+    def category_totals(self, start, end):
+        lo, hi = self._span(start, end)
+        return np.bincount(self.codes[lo:hi], self.cents[lo:hi], len(self.categories))
+
+    # Largest and smallest expense in a day range, as (amount, ISO date,
+    # category), or (None, None) when there are none
+    def extremes(self, start, end):
+        lo, hi = self._span(start, end)
+        if lo == hi:
+            return None, None
+        return tuple(self._expense(lo + index) for index in (np.argmax(self.cents[lo:hi]),
+                                                             np.argmin(self.cents[lo:hi])))
+
+    def _expense(self, index):
+        return (self.cents[index] / 100, str(self.days[index].astype('datetime64[D]')),
+                self.categories[self.codes[index]])
+
+    # Months with a goal, with what was spent in each: (months, spent cents,
+    # goal cents)
+    def goal_attainment(self):
+        if len(self.goal_months) == 0:
+            return self.goal_months, np.zeros(0), self.goal_cents
+        start, end = self.goal_months.min(), self.goal_months.max() + 1
+        _, spent = self.monthly(start, end)
+        return self.goal_months, spent[self.goal_months - start], self.goal_cents
+
+# Load a user's history in one query. Reads live and archived rows through
+# expense_history on the compact layout (migration 5) and the expenses table
+# before it; rows without a date or category are left out.
+def load_history(conn, username):
+    categories = db.get_categories(conn, username)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'expense_rows'").fetchone():
+        ids = dict(conn.execute("SELECT category, id FROM categories WHERE username = ?", (username,)))
+        category_ids = np.array([ids[name] for name in categories], dtype=np.int64)
+        rows = np.array(conn.execute(
+            "SELECT day, COALESCE(cents, 0), category_id FROM expense_history WHERE user_id = ? "
+            "AND day IS NOT NULL AND category_id IS NOT NULL ORDER BY day", (db.user_id(conn, username),)).fetchall(),
+            dtype=np.int64).reshape(-1, 3)
+        order = np.argsort(category_ids)
+        codes = order[np.searchsorted(category_ids, rows[:, 2], sorter=order)]
+        days, cents = rows[:, 0], rows[:, 1]
+    else:
+        rows = conn.execute(
+            "SELECT CAST(julianday(date) - 2440587.5 AS INTEGER), CAST(round(COALESCE(amount, 0) * 100) AS INTEGER), "
+            "category FROM expenses WHERE username = ? AND date IS NOT NULL AND category IS NOT NULL ORDER BY date",
+            (username,)).fetchall()
+        days = np.array([row[0] for row in rows], dtype=np.int64)
+        cents = np.array([row[1] for row in rows], dtype=np.int64)
+        names, codes = np.unique(np.array([row[2] for row in rows], dtype=object), return_inverse=True)
+        known = set(categories)
+        categories += [name for name in names if name not in known]
+        codes = np.array([categories.index(name) for name in names], dtype=np.int64)[codes]
+    goals = np.array(conn.execute("SELECT year * 12 + month - 1, goal_amount FROM goals WHERE username = ? "
+                                  "ORDER BY year, month", (username,)).fetchall(), dtype=np.float64).reshape(-1, 2)
+    return History(days.astype(np.int32), cents, codes.astype(np.int32), categories,
+                   goals[:, 0].astype(np.int32) - _EPOCH_MONTH, np.round(goals[:, 1] * 100))
+
+_histories = cache.LRUCache(HISTORY_CACHE_BYTES, weigh=lambda history: history.nbytes)
+
+# A user's History, loaded once per data version and shared across sessions
+def get_history(conn, username, version):
+    key = (username, version)
+    history = _histories.get(key)
+    if history is None:
+        history = load_history(conn, username)
+        _histories.put(key, history)
+    return history
+
+# Mean over the trailing `window` values (fewer at the start of the series)
+def rolling_mean(values, window):
+    sums = np.cumsum(values, dtype=np.float64)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(values) + 1), window)
+
+# Change from `lag` periods earlier (1 for month-over-month, 12 for
+# year-over-year on a monthly series), as (difference, fraction of the earlier
+# value); NaN where there is no earlier period or it was zero
+def change(values, lag):
+    values = np.asarray(values, dtype=np.float64)
+    difference = np.full(len(values), np.nan)
+    fraction = np.full(len(values), np.nan)
+    if len(values) > lag:
+        before = values[:-lag]
+        difference[lag:] = values[lag:] - before
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction[lag:] = np.where(before > 0, difference[lag:] / before, np.nan)
+    return difference, fraction
+
+# Average consecutive points into equal buckets so at most max_points are
+# returned; x is each bucket's first value. Every series in `ys` is bucketed
+# the same way.
+def resample(x, *ys, max_points=MAX_CHART_POINTS):
+    if len(x) <= max_points:
+        return (x, *ys)
+    size = -(-len(x) // max_points)
+    starts = np.arange(0, len(x), size)
+    counts = np.diff(np.append(starts, len(x)))
+    return (x[starts], *(np.add.reduceat(y, starts) / counts for y in ys))
+
+# Period numbers as NumPy dates, which Plotly draws on a time axis
+def as_dates(days):
+    return np.asarray(days).astype('datetime64[D]')
+
+def as_months(months):
+    return np.asarray(months).astype('datetime64[M]')
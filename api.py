@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import functools
+import math
+import secrets
+import sys
+import threading
+import time
+from datetime import date
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import db
+import writer
+
+HOST = '127.0.0.1'
+PORT = 8600
+SESSION_TTL = 12 * 3600     # seconds a token stays valid after login
+MAX_BATCH_ITEMS = 1000      # most expenses or wishlist items in one request
+MAX_MONTHS = 120            # longest monthly totals series
+
+# Login tokens held in memory: token -> (username, expiry). Restarting the
+# service logs every client out.
+class TokenSessions:
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def create(self, username):
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            self._tokens = {key: value for key, value in self._tokens.items() if value[1] > now}
+            self._tokens[token] = (username, now + self.ttl)
+        return token
+
+    def username(self, token):
+        with self._lock:
+            session = self._tokens.get(token)
+            if session is None:
+                return None
+            if session[1] <= time.monotonic():
+                del self._tokens[token]
+                return None
+            return session[0]
+
+    def revoke(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+sessions = TokenSessions()
+
+def _error(status, message):
+    return JSONResponse({'error': message}, status_code=status)
+
+def _token(request):
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    return token if scheme.lower() == 'bearer' else None
+
+# Run a db reader (conn, username, ...) on a pooled connection off the event loop
+def _read(fn, *args):
+    with db.connection() as conn:
+        return fn(conn, *args)
+
+# Handlers wrapped with this get the logged-in username, or the client gets 401
+def requires_session(handler):
+    @functools.wraps(handler)
+    async def wrapper(request):
+        username = sessions.username(_token(request))
+        if username is None:
+            return _error(401, "missing or expired token")
+        return await handler(request, username)
+    return wrapper
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+# Queue every write and wait for their group commits; one result per write,
+# {'id': rowid} or {'error': message}
+async def _gather_writes(futures):
+    outcomes = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+    return [{'error': str(outcome)} if isinstance(outcome, Exception) else {'id': outcome} for outcome in outcomes]
+
+def _batch_response(results):
+    failed = sum('error' in result for result in results)
+    return JSONResponse({'added': len(results) - failed, 'failed': failed, 'results': results})
+
+def _batch(body, key):
+    items = body.get(key) if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, f"body must be an object with a non-empty '{key}' list"
+    if len(items) > MAX_BATCH_ITEMS:
+        return None, f"at most {MAX_BATCH_ITEMS} {key} per request"
+    return items, None
+
+# Check one expense from a batch against the user's categories and pending
+# wishlist items (casefolded name -> id); returns the writer.add_expense
+# arguments or raises ValueError
+def _parse_expense(item, categories, wishlist):
+    if not isinstance(item, dict):
+        raise ValueError("expense must be an object")
+    try:
+        amount = float(item['amount'])
+        day = date.fromisoformat(item['date'])
+        category, description = item['category'], item['description']
+    except KeyError as error:
+        raise ValueError(f"missing {error.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number and date YYYY-MM-DD")
+    if not math.isfinite(amount) or amount < 0:
+        raise ValueError("amount must be zero or more")
+    if not isinstance(category, str) or category not in categories:
+        raise ValueError(f"unknown category {category!r}")
+    if not isinstance(description, str) or not description:
+        raise ValueError("description must be a non-empty string")
+    wishlist_item = item.get('wishlist_item')
+    if wishlist_item is not None and not isinstance(wishlist_item, str):
+        raise ValueError("wishlist_item must be a string")
+    wishlist_id = None
+    if wishlist_item is not None:
+        wishlist_id = wishlist.get(wishlist_item.strip().casefold())
+        if wishlist_id is None:
+            raise ValueError(f"no pending wishlist item {wishlist_item!r}")
+    return amount, category, day, description, wishlist_id
+
+def _parse_month(text):
+    year, _, month = (text or '').partition('-')
+    return date(int(year), int(month), 1)
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+def _month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+# POST /sessions {"username", "password"} -> {"token", "expires_in"}
+async def login(request):
+    body = await _json_body(request)
+    if not isinstance(body, dict) or not isinstance(body.get('username'), str) \
+            or not isinstance(body.get('password'), str):
+        return _error(400, "body must be an object with username and password")
+    if not await run_in_threadpool(db.authenticate, body['username'], body['password']):
+        return _error(401, "invalid username or password")
+    return JSONResponse({'token': sessions.create(body['username']), 'expires_in': sessions.ttl}, status_code=201)
+
+# DELETE /sessions logs the token out
+async def logout(request):
+    sessions.revoke(_token(request))
+    return JSONResponse({}, status_code=200)
+
+# POST /expenses/batch {"expenses": [{"amount", "category", "date",
+# "description", "wishlist_item"?}, ...]}. Each expense is its own write, so
+# invalid or failing ones are reported without holding back the rest.
+@requires_session
+async def add_expenses(request, username):
+    items, problem = _batch(await _json_body(request), 'expenses')
+    if problem:
+        return _error(400, problem)
+    categories = set(await run_in_threadpool(_read, db.get_categories, username))
+    wishlist = {}
+    if any(isinstance(item, dict) and item.get('wishlist_item') is not None for item in items):
+        wishlist = {name.strip().casefold(): item_id
+                    for item_id, name in await run_in_threadpool(_read, db.pending_wishlist, username) if name}
+    results, futures = [], []
+    for item in items:
+        try:
+            expense = _parse_expense(item, categories, wishlist)
+        except ValueError as error:
+            results.append({'error': str(error)})
+            continue
+        futures.append(writer.add_expense(username, *expense))
+        results.append(None)
+    written = iter(await _gather_writes(futures))
+    return _batch_response([result or next(written) for result in results])
+
+# POST /wishlist/batch {"items": ["item", ...]}
+@requires_session
+async def add_wishlist_items(request, username):
+    items, problem = _batch(await _json_body(request), 'items')
+    if problem:
+        return _error(400, problem)
+    results, futures = [], []
+    for item in items:
+        if not isinstance(item, str) or not item:
+            results.append({'error': "item must be a non-empty string"})
+            continue
+        futures.append(writer.add_wishlist_item(username, item))
+        results.append(None)
+    written = iter(await _gather_writes(futures))
+    return _batch_response([result or next(written) for result in results])
+
+# GET /totals/monthly?start=YYYY-MM&end=YYYY-MM -> spending per month, with
+# zero for months without any; defaults to the last twelve months
+@requires_session
+async def monthly_totals(request, username):
+    today = date.today()
+    try:
+        last = _parse_month(request.query_params['end']) if 'end' in request.query_params else today.replace(day=1)
+        first = (_parse_month(request.query_params['start']) if 'start' in request.query_params
+                 else _month_start(_month_index(last) - 11))
+    except ValueError:
+        return _error(400, "start and end must be YYYY-MM")
+    months = [_month_start(index).strftime('%Y-%m') for index in range(_month_index(first), _month_index(last) + 1)]
+    if not months or len(months) > MAX_MONTHS:
+        return _error(400, f"start must not be after end, and at most {MAX_MONTHS} months apart")
+    totals = dict(await run_in_threadpool(_read, db.monthly_totals, username, first, last))
+    return JSONResponse({'months': [{'month': month, 'total': round(totals.get(month, 0), 2)} for month in months]})
+
+# GET /categories/summary?start=YYYY-MM-DD&end=YYYY-MM-DD -> spending per
+# category over the inclusive range; defaults to the current month
+@requires_session
+async def category_summary(request, username):
+    today = date.today()
+    try:
+        start = date.fromisoformat(request.query_params.get('start', today.replace(day=1).isoformat()))
+        end = date.fromisoformat(request.query_params.get('end', today.isoformat()))
+    except ValueError:
+        return _error(400, "start and end must be YYYY-MM-DD")
+    if start > end:
+        return _error(400, "start must not be after end")
+    rows = await run_in_threadpool(_read, db.category_totals, username, start, end)
+    categories = {category: round(total, 2) for category, total in rows if category is not None}
+    return JSONResponse({'start': start.isoformat(), 'end': end.isoformat(),
+                         'total': round(sum(categories.values()), 2), 'categories': categories})
+
+app = Starlette(routes=[
+    Route('/sessions', login, methods=['POST']),
+    Route('/sessions', logout, methods=['DELETE']),
+    Route('/expenses/batch', add_expenses, methods=['POST']),
+    Route('/wishlist/batch', add_wishlist_items, methods=['POST']),
+    Route('/totals/monthly', monthly_totals, methods=['GET']),
+    Route('/categories/summary', category_summary, methods=['GET']),
+])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the expense tracker's JSON API on this machine.")
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args(argv)
+
+    db.use_database(args.db)
+    db.init_db()
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning', access_log=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import argparse
+import json
+import sys
+import time
+from datetime import date
+
+import db
+
+KEEP_MONTHS = 12    # months kept live, counting the current one
+
+# Half-open [start, end) day numbers of a 'YYYY-MM' month
+def _month_days(month):
+    year, number = int(month[:4]), int(month[5:7])
+    end = date(year + 1, 1, 1) if number == 12 else date(year, number + 1, 1)
+    return db.to_day(date(year, number, 1)), db.to_day(end)
+
+# First day of the oldest month kept live
+def cutoff(today, keep_months=KEEP_MONTHS):
+    index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+# Months before `before` (a date) that still have live rows, oldest first
+def closed_months(conn, before):
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT strftime('%Y-%m', day + 2440587.5) FROM main.expense_rows WHERE day < ? ORDER BY 1",
+        (db.to_day(before),))]
+
+# Second step of moving a batch, run with the write lock held. Copies that no
+# longer match their live row (edited or deleted since the copy) are dropped,
+# the summary totals are added back so deleting the live rows leaves
+# monthly_category_totals unchanged, and the batch is listed in
+# main.archived_batches in the same commit that deletes the live rows. The
+# archive side is redone on the next run if a crash lands between the two
+# files' commits.
+def _finish_batch(conn, batch):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        moved = None
+        if not conn.execute("SELECT 1 FROM main.archived_batches WHERE batch = ?", (batch,)).fetchone():
+            conn.execute('''DELETE FROM archive.expense_rows AS a WHERE a.batch = ? AND NOT EXISTS (
+                SELECT 1 FROM main.expense_rows AS m WHERE m.id = a.id AND m.user_id IS a.user_id
+                    AND m.category_id IS a.category_id AND m.day IS a.day AND m.cents IS a.cents
+                    AND m.description IS a.description)''', (batch,))
+            conn.execute('''INSERT INTO main.monthly_category_totals (username, month, category, total, count)
+                SELECT u.username, strftime('%Y-%m', a.day + 2440587.5), c.category,
+                    SUM(COALESCE(a.cents, 0)) / 100.0, COUNT(*)
+                FROM archive.expense_rows AS a
+                JOIN main.users AS u ON u.id = a.user_id
+                JOIN main.categories AS c ON c.id = a.category_id
+                WHERE a.batch = ? AND a.day IS NOT NULL
+                GROUP BY 1, 2, 3
+                ON CONFLICT (username, month, category)
+                DO UPDATE SET total = total + excluded.total, count = count + excluded.count''', (batch,))
+            moved = conn.execute("DELETE FROM main.expense_rows WHERE id IN "
+                                 "(SELECT id FROM archive.expense_rows WHERE batch = ?)", (batch,)).rowcount
+            conn.execute("INSERT INTO main.archived_batches (batch, month, rows, archived_at) "
+                         "SELECT batch, month, ?, datetime('now') FROM archive.archive_batches WHERE batch = ?",
+                         (moved, batch))
+        conn.execute("DELETE FROM archive.expense_rows WHERE batch = ? AND id IN (SELECT id FROM main.expense_rows)",
+                     (batch,))
+        conn.execute("DELETE FROM archive.monthly_category_totals WHERE batch = ?", (batch,))
+        conn.execute('''INSERT INTO archive.monthly_category_totals (batch, username, month, category, total, count)
+            SELECT a.batch, u.username, strftime('%Y-%m', a.day + 2440587.5), c.category,
+                SUM(COALESCE(a.cents, 0)) / 100.0, COUNT(*)
+            FROM archive.expense_rows AS a
+            JOIN main.users AS u ON u.id = a.user_id
+            JOIN main.categories AS c ON c.id = a.category_id
+            WHERE a.batch = ? AND a.day IS NOT NULL
+            GROUP BY 2, 3, 4''', (batch,))
+        conn.execute("UPDATE archive.archive_batches SET done = 1 WHERE batch = ?", (batch,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return moved
+
+# Finish batches left half done by an interrupted run
+def reconcile(conn):
+    batches = [row[0] for row in conn.execute("SELECT batch FROM archive.archive_batches WHERE done = 0 "
+                                              "ORDER BY batch")]
+    for batch in batches:
+        _finish_batch(conn, batch)
+    return len(batches)
+
+# Move one month's live rows to the archive as a new batch; returns the number
+# of rows moved. The copy is committed first without being visible to readers,
+# so the write lock is only held for the short second step.
+def archive_month(conn, month):
+    start, end = _month_days(month)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        batch = conn.execute("SELECT COALESCE(MAX(batch), 0) + 1 FROM archive.archive_batches").fetchone()[0]
+        conn.execute("INSERT INTO archive.archive_batches (batch, month) VALUES (?, ?)", (batch, month))
+        conn.execute("INSERT INTO archive.expense_rows (id, user_id, category_id, day, cents, description, batch) "
+                     "SELECT id, user_id, category_id, day, cents, description, ? FROM main.expense_rows "
+                     "WHERE day >= ? AND day < ?", (batch, start, end))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return _finish_batch(conn, batch)
+
+# Archive every closed month older than the last keep_months, oldest first.
+# Runs against `path` with its own connection; safe to run while the app is
+# serving, and to rerun after an interruption.
+def run(path, keep_months=KEEP_MONTHS, today=None, vacuum=False, log=print):
+    if keep_months < 1:
+        raise ValueError("keep_months must be at least 1; the current month is never archived")
+    db.use_database(path)
+    db.init_db()
+    conn = db.connect(path)
+    conn.isolation_level = None
+    started = time.perf_counter()
+    try:
+        recovered = reconcile(conn)
+        if recovered:
+            log(f"finished {recovered} interrupted batches")
+        before = cutoff(today or date.today(), keep_months)
+        months = closed_months(conn, before)
+        log(f"{len(months)} months before {before:%Y-%m} to archive")
+        moved = 0
+        for month in months:
+            month_started = time.perf_counter()
+            rows = archive_month(conn, month)
+            moved += rows
+            log(f"{month}: {rows} rows in {time.perf_counter() - month_started:.2f}s")
+        if vacuum:
+            conn.execute("VACUUM main")
+        summary = {
+            'months': len(months),
+            'moved_rows': moved,
+            'live_rows': conn.execute("SELECT COUNT(*) FROM main.expense_rows").fetchone()[0],
+            'archived_rows': conn.execute("SELECT COUNT(*) FROM archive.expense_rows").fetchone()[0],
+            'seconds': round(time.perf_counter() - started, 2),
+        }
+    finally:
+        conn.close()
+    log(f"moved {summary['moved_rows']} rows in {summary['seconds']}s; {summary['live_rows']} live, "
+        f"{summary['archived_rows']} archived")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move expenses from closed months into the archive database.")
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--keep-months', type=int, default=KEEP_MONTHS,
+                        help="months kept live, counting the current one")
+    parser.add_argument('--vacuum', action='store_true', help="compact the main database afterwards")
+    args = parser.parse_args(argv)
+
+    summary = run(args.db, args.keep_months, vacuum=args.vacuum, log=lambda message: print(message, file=sys.stderr))
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
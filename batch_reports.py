@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from urllib.parse import quote
+
+import db
+import export
+import instrumentation
+import reports
+
+OUTPUT_DIR = './data/reports'
+FORMATS = ('pdf', 'csv')
+SLOWEST_SHOWN = 5
+
+_conn = None
+
+# Each worker process opens its own read-only connection once, so workers
+# never take write locks and can't disturb the live app. Archived months are
+# read through the archive database, attached read-only as well.
+def _init_worker(path):
+    global _conn
+    _conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True,
+                            timeout=db.BUSY_TIMEOUT_MS / 1000)
+    db.attach_archive(_conn, path, readonly=True)
+    _conn.execute("PRAGMA query_only = 1")
+
+def _user_dir(out_dir, username):
+    return os.path.join(out_dir, quote(username, safe=''))
+
+def _output_paths(out_dir, username, period, formats):
+    user_dir = _user_dir(out_dir, username)
+    paths = {}
+    if 'pdf' in formats:
+        paths['pdf'] = os.path.join(user_dir, period.filename)
+    if 'csv' in formats:
+        paths['csv'] = os.path.join(user_dir, export.export_filename(username, period.start, period.end, 'csv'))
+    return paths
+
+# Files are written under a temporary name and renamed into place, so a file
+# that exists is complete; a crashed run leaves at most a stray .tmp behind
+def _write(path, chunks):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+def _report_user(username, year, month, out_dir, formats):
+    started = time.perf_counter()
+    period = reports.ReportPeriod.month(year, month)
+    result = {'username': username, 'bytes': 0}
+    try:
+        paths = _output_paths(out_dir, username, period, formats)
+        os.makedirs(_user_dir(out_dir, username), exist_ok=True)
+        if 'pdf' in paths:
+            result['bytes'] += _write(paths['pdf'], [reports.build_report(_conn, username, period)])
+        if 'csv' in paths:
+            result['bytes'] += _write(paths['csv'], export.export_chunks(_conn, username, period.start, period.end, 'csv'))
+    except Exception as error:
+        result['error'] = f"{type(error).__name__}: {error}"
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    return result
+
+def _previous_month(today):
+    return (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+
+# Generate month-end reports for every user (or just `usernames`) under
+# out_dir/YYYY-MM/<user>/. Users whose files are all present are skipped, so a
+# crashed or interrupted run picks up where it stopped; force rebuilds all.
+# Per-user timings are appended to timings.jsonl as they finish.
+def run(path, year, month, out_dir=OUTPUT_DIR, workers=None, formats=FORMATS, usernames=None, force=False,
+        log=print):
+    started = time.perf_counter()
+    period = reports.ReportPeriod.month(year, month)
+    month_dir = os.path.join(out_dir, f"{year}-{month:02d}")
+    os.makedirs(month_dir, exist_ok=True)
+
+    # Read the user list and close the connection before the workers fork
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+    try:
+        all_users = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY username")]
+    finally:
+        conn.close()
+    if usernames:
+        wanted = set(usernames)
+        all_users = [username for username in all_users if username in wanted]
+    pending = [username for username in all_users
+               if force or not all(os.path.exists(p) for p in _output_paths(month_dir, username, period, formats).values())]
+    log(f"{len(all_users)} users, {len(all_users) - len(pending)} already done, {len(pending)} to generate "
+        f"for {year}-{month:02d} with {workers or os.cpu_count()} workers")
+
+    results = []
+    with open(os.path.join(month_dir, 'timings.jsonl'), 'a') as timings, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as executor:
+        futures = [executor.submit(_report_user, username, year, month, month_dir, formats) for username in pending]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                results.append(result)
+                timings.write(json.dumps(result) + '\n')
+                timings.flush()
+                if 'error' in result:
+                    log(f"{result['username']}: {result['error']}")
+                if done % 100 == 0 or done == len(futures):
+                    elapsed = time.perf_counter() - started
+                    log(f"{done}/{len(futures)} users in {elapsed:.1f}s ({done / elapsed:.1f} users/s)")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    elapsed = time.perf_counter() - started
+    summary = {'users': len(all_users), 'generated': 0, 'failed': 0, 'skipped': len(all_users) - len(pending),
+               'seconds': round(elapsed, 2)}
+    seconds = sorted(result['seconds'] for result in results)
+    summary['failed'] = sum('error' in result for result in results)
+    summary['generated'] = len(results) - summary['failed']
+    if seconds:
+        summary.update({
+            'user_p50_s': instrumentation.percentile(seconds, 50),
+            'user_p95_s': instrumentation.percentile(seconds, 95),
+            'user_max_s': seconds[-1],
+            'bytes': sum(result['bytes'] for result in results),
+        })
+        log(f"per user: p50 {summary['user_p50_s'] * 1000:.1f} ms, p95 {summary['user_p95_s'] * 1000:.1f} ms, "
+            f"max {summary['user_max_s'] * 1000:.1f} ms")
+        for result in sorted(results, key=lambda result: result['seconds'], reverse=True)[:SLOWEST_SHOWN]:
+            log(f"  slowest: {result['username']} {result['seconds'] * 1000:.1f} ms")
+    log(f"{summary['generated']} generated, {summary['failed']} failed, {summary['skipped']} skipped "
+        f"in {elapsed:.1f}s")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate month-end PDF and CSV reports for every user.")
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--month', help="YYYY-MM (default: last month)")
+    parser.add_argument('-o', '--output', default=OUTPUT_DIR, help="root of the output directory tree")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--users', nargs='+', help="only these users")
+    parser.add_argument('--force', action='store_true', help="rebuild reports that already exist")
+    args = parser.parse_args(argv)
+
+    year, month = (int(part) for part in args.month.split('-')) if args.month else _previous_month(date.today())
+    summary = run(args.db, year, month, args.output, args.workers, tuple(args.formats), args.users, args.force,
+                  log=lambda message: print(message, file=sys.stderr))
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# Synthetic-load benchmarks for the tracker's hot paths.
+#
+#   python -m benchmarks.generate --db bench.db --users 10000 --expenses 10000000
+#   python -m benchmarks.run --db bench.db -o results.json [--compare baseline.json]
+#   python -m benchmarks.import_time
+#   python -m benchmarks.writes --db bench.db --sessions 1 8 32
+#   python -m benchmarks.api_load --db bench.db --connections 1 16 64
+#   python -m benchmarks.layout --db legacy.db    (generated with --schema-version 4)
+#   python -m benchmarks.archive --db bench.db --keep-months 12
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import json
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date
+
+from benchmarks.generate import PASSWORD
+from benchmarks.run import BENCH_USER, BENCH_USER_PREFIX, summarize
+
+PORT = 8611
+MARKER = BENCH_USER_PREFIX + 'api'
+STARTUP_TIMEOUT = 30
+
+# Minimal keep-alive HTTP/1.1 client, so the load generator costs little next
+# to the server it is measuring
+class _Client:
+    def __init__(self, reader, writer, token=None):
+        self.reader = reader
+        self.writer = writer
+        self.token = token
+
+    @classmethod
+    async def open(cls, port):
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+
+    async def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [f"{method} {path} HTTP/1.1", "Host: 127.0.0.1", f"Content-Length: {len(payload)}",
+                   "Content-Type: application/json"]
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode('latin-1').split("\r\n")
+        status = int(head[0].split()[1])
+        length = next(int(line.split(':', 1)[1]) for line in head if line.lower().startswith('content-length:'))
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+# Reads run first, before the write scenarios add to this month's data
+def _scenarios(batch, today):
+    month = today.strftime('%Y-%m')
+    expenses = {'expenses': [{'amount': 4.25, 'category': 'Food', 'date': today.isoformat(), 'description': MARKER}
+                             for _ in range(batch)]}
+    return {
+        'monthly_totals': ('GET', '/totals/monthly', None, 1),
+        'category_summary': ('GET', f'/categories/summary?start={month}-01&end={today.isoformat()}', None, 1),
+        'expenses_batch': ('POST', '/expenses/batch', expenses, batch),
+        'wishlist_batch': ('POST', '/wishlist/batch', {'items': [MARKER] * batch}, batch),
+    }
+
+# Every client sends the same request back to back for `duration` seconds
+async def _load(clients, method, path, body, duration):
+    latencies = [[] for _ in clients]
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def drive(index, client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status, _ = await client.request(method, path, body)
+            latencies[index].append((time.perf_counter() - started) * 1000)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(index, client) for index, client in enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    return [ms for client_latencies in latencies for ms in client_latencies], errors, elapsed
+
+# Open `count` connections, each logged in as a different user. Connections
+# are opened per step because the server drops ones left idle.
+async def _connect(port, usernames, count):
+    clients = []
+    for username in usernames[:count]:
+        client = await _Client.open(port)
+        clients.append(client)
+        status, body = await client.request('POST', '/sessions', {'username': username, 'password': PASSWORD})
+        if status != 201:
+            raise SystemExit(f"could not log in as {username}: {body}")
+        client.token = body['token']
+    return clients
+
+async def _run(port, usernames, connection_counts, duration, batch, log):
+    results = {}
+    for name, (method, path, body, items) in _scenarios(batch, date.today()).items():
+        for count in connection_counts:
+            clients = await _connect(port, usernames, count)
+            try:
+                latencies, errors, elapsed = await _load(clients, method, path, body, duration)
+            finally:
+                for client in clients:
+                    client.close()
+            key = f"{name}.{count}_connections"
+            results[key] = summarize(latencies)
+            results[key].update({'requests_per_s': round(len(latencies) / elapsed, 1),
+                                 'items_per_s': round(len(latencies) * items / elapsed, 1), 'errors': errors})
+            log(f"{key:40s} {results[key]['requests_per_s']:9.1f} req/s {results[key]['items_per_s']:10.1f} "
+                f"items/s   p50 {results[key]['p50_ms']:8.2f} ms   p95 {results[key]['p95_ms']:8.2f} ms"
+                + (f"   {errors} errors" if errors else ""))
+    return results
+
+def _wait_for_port(port, server):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("API server exited during startup")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"API server did not start listening on port {port}")
+
+# Start the API against `path` in its own process, load it from this one and
+# delete what the write scenarios added
+def run(path, connection_counts=(1, 16, 64), duration=5.0, batch=50, port=PORT, log=print):
+    conn = sqlite3.connect(path)
+    usernames = [row[0] for row in conn.execute(f"SELECT username FROM users WHERE NOT {BENCH_USER} ORDER BY id "
+                                                "LIMIT ?", (BENCH_USER_PREFIX, max(connection_counts)))]
+    conn.close()
+    server = subprocess.Popen([sys.executable, '-m', 'api', '--db', path, '--port', str(port)])
+    try:
+        _wait_for_port(port, server)
+        results = asyncio.run(_run(port, usernames, connection_counts, duration, batch, log))
+    finally:
+        server.terminate()
+        server.wait()
+        conn = sqlite3.connect(path)
+        conn.execute("DELETE FROM expenses WHERE description = ?", (MARKER,))
+        conn.execute("DELETE FROM wishlist WHERE item = ?", (MARKER,))
+        conn.commit()
+        conn.close()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure requests per second against the JSON API.")
+    parser.add_argument('--db', required=True, help="database built by benchmarks.generate")
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument('--batch', type=int, default=50, help="expenses or wishlist items per batch request")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.db, args.connections, args.duration, args.batch, args.port,
+                  log=lambda message: print(message, file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import analytics
+import archive
+import db
+import export
+
+LIVE_OBJECTS = ('expense_rows', 'idx_expense_rows_user_day', 'idx_expense_rows_user_category_day', 'idx_expense_rows_day',
+                'expenses_fts_data', 'expenses_fts_idx', 'expenses_fts_docsize')
+
+def _sizes(path):
+    conn = sqlite3.connect(path)
+    pages = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    conn.close()
+    return {
+        'file_bytes': os.path.getsize(path),
+        'live_expense_bytes': sum(pages.get(name, 0) for name in LIVE_OBJECTS),
+        'objects': {name: pages[name] for name in LIVE_OBJECTS if name in pages},
+    }
+
+# The reads that must see archived months: the Dashboard's history load and
+# range summaries, a Browse page, and a whole-history CSV export
+def _time_reads(conn, heavy, end, runs):
+    start = end - timedelta(days=3 * 365)
+    reads = {
+        'dashboard.history_load': lambda: analytics.load_history(conn, heavy),
+        'dashboard.category_totals_3y': lambda: db.category_totals(conn, heavy, start, end),
+        'browse.first_page': lambda: db.browse_expenses(conn, heavy, limit=51),
+        'export.csv_history': lambda: sum(len(chunk) for chunk in export.export_chunks(conn, heavy, None, None, 'csv')),
+    }
+    results, answers = {}, {}
+    for name, read in reads.items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            answer = read()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = round(statistics.median(timings), 3)
+        answers[name] = answer
+    return results, answers
+
+# Summed totals may differ in the last bits once part of them is precomputed
+def _rounded(answer):
+    if isinstance(answer, float):
+        return round(answer, 6)
+    if isinstance(answer, (list, tuple)):
+        return [_rounded(item) for item in answer]
+    return answer
+
+def _measure(path, label, heavy, end, runs, log):
+    db.use_database(path)
+    with db.connection() as conn:
+        read_ms, answers = _time_reads(conn, heavy, end, runs)
+    db.use_database(db.DB_PATH)
+    result = {'sizes': _sizes(path), 'read_ms': read_ms}
+    log(f"{label:9s} file {result['sizes']['file_bytes'] / 2**20:7.1f} MiB   "
+        f"live expenses {result['sizes']['live_expense_bytes'] / 2**20:7.1f} MiB   "
+        + "   ".join(f"{name} {ms:.1f} ms" for name, ms in read_ms.items()))
+    return result, answers
+
+# Copy a database, time the archive-aware reads, archive everything but the
+# last keep_months (vacuuming the main file) and time them again. The reads
+# must return the same answers on both sides.
+def run(path, keep_months=archive.KEEP_MONTHS, runs=5, log=print):
+    with tempfile.TemporaryDirectory() as workdir:
+        copy = os.path.join(workdir, 'archive.db')
+        shutil.copyfile(path, copy)
+        db.use_database(copy)
+        db.init_db()
+        with db.connection() as conn:
+            heavy = conn.execute("SELECT username FROM monthly_category_totals GROUP BY username "
+                                 "ORDER BY SUM(count) DESC LIMIT 1").fetchone()[0]
+            last = conn.execute("SELECT MAX(day) FROM expense_rows").fetchone()[0]
+        end = db.UNIX_EPOCH + timedelta(days=last)
+        results = {}
+        results['live'], before = _measure(copy, 'all live', heavy, end, runs, log)
+        results['archive'] = archive.run(copy, keep_months, today=end, vacuum=True, log=lambda message: None)
+        log(f"archived {results['archive']['moved_rows']} rows from {results['archive']['months']} months "
+            f"in {results['archive']['seconds']}s")
+        results['archived'], after = _measure(copy, 'archived', heavy, end, runs, log)
+        results['archived']['archive_file_bytes'] = os.path.getsize(db.archive_path(copy))
+        mismatched = [name for name in before if name != 'dashboard.history_load'
+                      and _rounded(before[name]) != _rounded(after[name])]
+        history_before, history_after = before['dashboard.history_load'], after['dashboard.history_load']
+        if (history_before.days.tolist(), history_before.cents.tolist()) != \
+                (history_after.days.tolist(), history_after.cents.tolist()):
+            mismatched.append('dashboard.history_load')
+        if mismatched:
+            raise SystemExit(f"reads changed after archiving: {', '.join(mismatched)}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare live-table size and reads before and after archiving.")
+    parser.add_argument('--db', required=True, help="database built by benchmarks.generate")
+    parser.add_argument('--keep-months', type=int, default=archive.KEEP_MONTHS)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    results = run(args.db, args.keep_months, args.runs, log=lambda message: print(message, file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+import db
+
+BATCH_SIZE = 50000
+PASSWORD = 'password'
+
+# Typical spend per category: (weight, median amount, spread)
+CATEGORY_PROFILES = {
+    'Food': (0.38, 14.0, 0.7),
+    'Transport': (0.20, 9.0, 0.6),
+    'Entertainment': (0.12, 25.0, 0.8),
+    'Education': (0.06, 60.0, 1.0),
+    'Rent': (0.02, 900.0, 0.2),
+    'Others': (0.12, 30.0, 1.1),
+    'Groceries': (0.07, 45.0, 0.5),
+    'Health': (0.03, 40.0, 0.9),
+}
+DESCRIPTION_WORDS = {
+    'Food': ['lunch', 'dinner', 'coffee', 'breakfast', 'pizza', 'sushi', 'takeaway', 'bakery'],
+    'Transport': ['bus', 'train', 'taxi', 'fuel', 'parking', 'metro card', 'bike repair'],
+    'Entertainment': ['movie', 'concert', 'game', 'streaming', 'museum', 'bowling'],
+    'Education': ['books', 'course', 'tuition', 'stationery', 'workshop'],
+    'Rent': ['rent'],
+    'Others': ['gift', 'phone bill', 'haircut', 'laundry', 'charity', 'electronics'],
+    'Groceries': ['supermarket', 'market', 'butcher', 'greengrocer'],
+    'Health': ['pharmacy', 'dentist', 'gym', 'doctor'],
+}
+WISHLIST_ITEMS = ['headphones', 'laptop', 'running shoes', 'camera', 'tablet', 'desk chair',
+                  'smart watch', 'bicycle', 'backpack', 'coffee machine', 'guitar', 'monitor']
+
+def username_for(index):
+    return f"user{index:06d}"
+
+# Each user's share of all expenses follows a Zipf-like curve, so a few heavy
+# users have years of dense history and most have a little
+def _user_weights(users, rng):
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(users)]
+    rng.shuffle(weights)
+    total = sum(weights)
+    return [w / total for w in weights]
+
+def _expense_rows(users, expenses, years, rng, end_day):
+    names = list(CATEGORY_PROFILES)
+    category_weights = [CATEGORY_PROFILES[name][0] for name in names]
+    span = int(years * 365)
+    weights = _user_weights(users, rng)
+    remaining = expenses
+    for index, weight in enumerate(weights):
+        count = remaining if index == users - 1 else min(remaining, round(expenses * weight))
+        remaining -= count
+        username = username_for(index)
+        for category in rng.choices(names, category_weights, k=count):
+            _, median, spread = CATEGORY_PROFILES[category]
+            amount = round(math.exp(rng.gauss(math.log(median), spread)), 2)
+            day = end_day - timedelta(days=rng.randrange(span))
+            description = rng.choice(DESCRIPTION_WORDS[category])
+            yield (username, amount, category, day.isoformat(), description)
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Fill a fresh database with seeded synthetic data. Rows are loaded into the
+# base tables first and the schema migrations run afterwards, so indexes,
+# summary tables and triggers are built once over the full data set.
+def generate(path, users=10000, expenses=10000000, years=5, seed=42, end_day=None, schema_version=None,
+             log=print):
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    rng = random.Random(seed)
+    end_day = end_day or date.today()
+    started = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    db._create_tables(conn)
+
+    password = db.hash_password(PASSWORD)
+    conn.executemany("INSERT INTO users (username, password, name, email) VALUES (?, ?, ?, ?)",
+                     ((username_for(i), password, f"User {i}", f"{username_for(i)}@example.com") for i in range(users)))
+    conn.executemany("INSERT INTO categories (username, category) VALUES (?, ?)",
+                     ((username_for(i), category) for i in range(users) for category in CATEGORY_PROFILES))
+    conn.executemany("INSERT INTO wishlist (username, item, purchased) VALUES (?, ?, ?)",
+                     ((username_for(i), item, int(rng.random() < 0.3))
+                      for i in range(users) for item in rng.sample(WISHLIST_ITEMS, rng.randint(0, 6))))
+    months = []
+    year, month = end_day.year, end_day.month
+    for _ in range(12):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    conn.executemany("INSERT INTO goals (username, year, month, goal_amount) VALUES (?, ?, ?, ?)",
+                     ((username_for(i), year, month, rng.choice([500, 800, 1000, 1500, 2500]))
+                      for i in range(users) for year, month in months if rng.random() < 0.6))
+    conn.commit()
+    log(f"users, categories, wishlist and goals loaded in {time.perf_counter() - started:.1f}s")
+
+    loaded = 0
+    for batch in _batched(_expense_rows(users, expenses, years, rng, end_day)):
+        conn.executemany("INSERT INTO expenses (username, amount, category, date, description) VALUES (?, ?, ?, ?, ?)",
+                         batch)
+        loaded += len(batch)
+        if loaded % (BATCH_SIZE * 20) == 0:
+            conn.commit()
+            log(f"{loaded:,} expenses ({loaded / (time.perf_counter() - started):,.0f} rows/s)")
+    conn.commit()
+    log(f"{loaded:,} expenses loaded in {time.perf_counter() - started:.1f}s, migrating")
+    db.migrate_db(conn, schema_version)
+    conn.execute("ANALYZE")
+    conn.close()
+    log(f"done in {time.perf_counter() - started:.1f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic expense tracker database.")
+    parser.add_argument('--db', required=True, help="path of the database to create")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--expenses', type=int, default=10000000)
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, help="last day of generated history (default: today)")
+    parser.add_argument('--schema-version', type=int, help="stop migrating at this version (default: latest)")
+    args = parser.parse_args(argv)
+    generate(args.db, args.users, args.expenses, args.years, args.seed, args.end_date, args.schema_version)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each scenario imports in a fresh interpreter. "eager" is what main.py
+# used to import up front before pages were split into views/.
+SCENARIOS = {
+    'login': ['main', 'views.auth'],
+    'dashboard': ['main', 'views.dashboard'],
+    'add_expense': ['main', 'views.add_expense'],
+    'reports': ['main', 'views.reports'],
+    'eager': ['main', 'pandas', 'plotly.express', 'plotly.graph_objects',
+              'reportlab.lib.pagesizes', 'reportlab.pdfgen.canvas'],
+}
+
+_PROBE = """
+import importlib, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(time.perf_counter() - started)
+"""
+
+# Seconds to import modules in a new interpreter, median of several runs
+def import_seconds(modules, runs=5):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE, *modules], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time per page.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, modules in SCENARIOS.items():
+        results[name] = round(import_seconds(modules, args.runs) * 1000, 1)
+        print(f"{name:12s} {results[name]:8.1f} ms", file=sys.stderr)
+    print(f"login page saves {results['eager'] - results['login']:.1f} ms "
+          f"({1 - results['login'] / results['eager']:.0%}) against eager imports", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'import_ms': results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import db
+
+COMPACT_VERSION = 5
+
+# The same three reads against each layout: a full-table aggregate, one year
+# of a heavy user's spending by category, and a heavy user's whole history in
+# date order (what export and PDF reports do)
+SCANS = {
+    'legacy': {
+        'full_sum': ("SELECT SUM(amount), COUNT(*) FROM expenses", ()),
+        'user_year_by_category': ("SELECT category, SUM(amount) FROM expenses WHERE username = ? "
+                                  "AND date >= ? AND date < ? GROUP BY category", ('user', 'start', 'end')),
+        'user_history': ("SELECT date, category, amount, description FROM expenses WHERE username = ? "
+                         "ORDER BY date, id", ('user',)),
+    },
+    'compact': {
+        'full_sum': ("SELECT SUM(cents), COUNT(*) FROM expense_rows", ()),
+        'user_year_by_category': ("SELECT c.category, SUM(e.cents) FROM expense_rows AS e "
+                                  "LEFT JOIN categories AS c ON c.id = e.category_id "
+                                  f"WHERE e.user_id = {db.USER_ID} AND e.day >= ? AND e.day < ? "
+                                  "GROUP BY e.category_id", ('user', 'start_day', 'end_day')),
+        'user_history': ("SELECT date(e.day + 2440587.5), c.category, e.cents / 100.0, e.description "
+                         "FROM expense_rows AS e LEFT JOIN categories AS c ON c.id = e.category_id "
+                         f"WHERE e.user_id = {db.USER_ID} ORDER BY e.day, e.id", ('user',)),
+    },
+}
+EXPENSE_OBJECTS = {
+    'legacy': ('expenses', 'idx_expenses_user_date', 'idx_expenses_user_category_date'),
+    'compact': ('expense_rows', 'idx_expense_rows_user_day', 'idx_expense_rows_user_category_day',
+                'users', 'sqlite_autoindex_users_1', 'categories', 'sqlite_autoindex_categories_1'),
+}
+
+def _sizes(conn, layout):
+    pages = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    page_size, page_count = (conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ('page_size', 'page_count'))
+    return {
+        'file_bytes': page_size * page_count,
+        'expense_bytes': sum(pages.get(name, 0) for name in EXPENSE_OBJECTS[layout]),
+        'objects': {name: pages[name] for name in EXPENSE_OBJECTS[layout] if name in pages},
+    }
+
+def _time_scans(conn, layout, values, runs):
+    results = {}
+    for name, (sql, keys) in SCANS[layout].items():
+        params = [values[key] for key in keys]
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = round(statistics.median(timings), 3)
+    return results
+
+def _measure(path, layout, values, runs, log):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    result = {'sizes': _sizes(conn, layout), 'scan_ms': _time_scans(conn, layout, values, runs)}
+    conn.close()
+    log(f"{layout:8s} file {result['sizes']['file_bytes'] / 2**20:8.1f} MiB   "
+        f"expenses {result['sizes']['expense_bytes'] / 2**20:8.1f} MiB   "
+        + "   ".join(f"{name} {ms:.1f} ms" for name, ms in result['scan_ms'].items()))
+    return result
+
+# Copy a database still on the legacy layout, measure it, migrate the copy to
+# the compact layout and measure again. Both copies are vacuumed first so the
+# sizes compare live data rather than free pages.
+def run(path, runs=5, log=print):
+    conn = sqlite3.connect(path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    heavy = conn.execute("SELECT username FROM monthly_category_totals GROUP BY username "
+                         "ORDER BY SUM(count) DESC LIMIT 1").fetchone()[0]
+    last = conn.execute("SELECT MAX(date) FROM expenses WHERE username = ?", (heavy,)).fetchone()[0]
+    conn.close()
+    if version >= COMPACT_VERSION:
+        raise SystemExit(f"{path} is already on the compact layout (user_version {version})")
+    end = f"{int(last[:4])}-{last[5:7]}-01"
+    start = f"{int(last[:4]) - 1}-{last[5:7]}-01"
+    values = {'user': heavy, 'start': start, 'end': end, 'start_day': db.to_day(start), 'end_day': db.to_day(end)}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        legacy, compact = os.path.join(workdir, 'legacy.db'), os.path.join(workdir, 'compact.db')
+        shutil.copyfile(path, legacy)
+        conn = sqlite3.connect(legacy)
+        db.migrate_db(conn, COMPACT_VERSION - 1)
+        conn.close()
+        shutil.copyfile(legacy, compact)
+        results = {'legacy': _measure(legacy, 'legacy', values, runs, log)}
+        conn = sqlite3.connect(compact)
+        started = time.perf_counter()
+        db.migrate_db(conn, COMPACT_VERSION)
+        migrate_seconds = time.perf_counter() - started
+        conn.close()
+        log(f"migrated in {migrate_seconds:.1f}s")
+        results['compact'] = _measure(compact, 'compact', values, runs, log)
+    results['migrate_s'] = round(migrate_seconds, 2)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the legacy and compact expense layouts.")
+    parser.add_argument('--db', required=True, help="database on the legacy layout, e.g. from "
+                                                    "benchmarks.generate --schema-version 4")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    results = run(args.db, args.runs, log=lambda message: print(message, file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import analytics
+import db
+import export
+import instrumentation
+import reports
+from benchmarks.generate import PASSWORD
+
+BENCH_USER_PREFIX = 'bench_'
+# Matches usernames starting with BENCH_USER_PREFIX; bind the prefix. Not LIKE,
+# where the '_' would match any character and catch real users.
+BENCH_USER = f"substr(username, 1, {len(BENCH_USER_PREFIX)}) = ?"
+
+def summarize(durations):
+    durations = sorted(durations)
+    return {
+        'samples': len(durations),
+        'mean_ms': round(statistics.fmean(durations), 4),
+        'p50_ms': round(instrumentation.percentile(durations, 50), 4),
+        'p95_ms': round(instrumentation.percentile(durations, 95), 4),
+        'min_ms': round(durations[0], 4),
+        'max_ms': round(durations[-1], 4),
+    }
+
+def measure(fn, args_list):
+    durations = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        durations.append((time.perf_counter() - started) * 1000)
+    return summarize(durations)
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Users the benchmarks act as: the heaviest user plus a random sample
+def _pick_users(conn, count, rng):
+    heavy = conn.execute("SELECT username FROM monthly_category_totals GROUP BY username "
+                         "ORDER BY SUM(count) DESC LIMIT 1").fetchone()[0]
+    usernames = [row[0] for row in conn.execute(f"SELECT username FROM users WHERE NOT {BENCH_USER}",
+                                                (BENCH_USER_PREFIX,))]
+    return heavy, rng.sample(usernames, min(count, len(usernames)))
+
+# Last month with data that is fully in the past, so month benchmarks see a full month
+def _last_full_month(conn):
+    month = conn.execute("SELECT MAX(month) FROM monthly_category_totals").fetchone()[0]
+    year, month = int(month[:4]), int(month[5:7])
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+# The Dashboard's category chart setup, as done in views.dashboard.render()
+def _dashboard_range(conn, username, start_date, end_date):
+    history = analytics.get_history(conn, username, db.data_version(conn, username))
+    start_day, end_day = db.day_numbers(start_date, end_date)
+    history.extremes(start_day, end_day)
+    return history.category_totals(start_day, end_day)
+
+def _dashboard_month(conn, username, year, month):
+    db.get_goal(conn, username, year, month)
+    db.month_total(conn, username, year, month)
+
+def _add_expense(conn, username, day):
+    conn.execute(db.INSERT_EXPENSE, db.expense_params(username, 12.5, 'Food', day, BENCH_USER_PREFIX + 'expense'))
+    conn.commit()
+
+def _export_csv(conn, username, start_date, end_date):
+    for _ in export.export_chunks(conn, username, start_date, end_date, 'csv'):
+        pass
+
+def _log(message):
+    print(message, file=sys.stderr)
+
+def run(path, samples=200, seed=7, log=_log):
+    rng = random.Random(seed)
+    db.use_database(path)
+    results = {}
+    with db.connection() as conn:
+        heavy, users = _pick_users(conn, samples, rng)
+        year, month = _last_full_month(conn)
+        period = reports.ReportPeriod.month(year, month)
+        month_start, month_end = period.start, period.end
+        expense_count = conn.execute("SELECT COUNT(*) FROM expense_rows").fetchone()[0]
+        user_count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+        def bench(name, fn, args_list):
+            results[name] = measure(fn, args_list)
+            log(f"{name:32s} p50 {results[name]['p50_ms']:10.3f} ms   p95 {results[name]['p95_ms']:10.3f} ms")
+
+        bench('auth.authenticate', db.authenticate, [(u, PASSWORD) for u in users])
+        bench('auth.add_user', db.add_user,
+              [(f"{BENCH_USER_PREFIX}{i}", PASSWORD, 'Bench', 'bench@example.com') for i in range(samples)])
+        bench('dashboard.month', _dashboard_month, [(conn, u, year, month) for u in users])
+        bench('dashboard.month_heavy', _dashboard_month, [(conn, heavy, year, month)] * samples)
+        ranges = [(conn, u, month_end - timedelta(days=rng.randrange(5, 400)), month_end) for u in users]
+        bench('dashboard.range', _dashboard_range, ranges)
+        bench('dashboard.range_heavy', _dashboard_range,
+              [(conn, heavy, start, end) for _, _, start, end in ranges])
+        bench('dashboard.history_load_heavy', analytics.load_history, [(conn, heavy)] * 10)
+        bench('add_expense.insert', _add_expense, [(conn, u, month_start.isoformat()) for u in users])
+        bench('reports.csv_month', _export_csv, [(conn, u, month_start, month_end) for u in users[:50]])
+        bench('reports.csv_history_heavy', _export_csv, [(conn, heavy, None, None)] * 3)
+        bench('reports.pdf_month_heavy', reports.build_report,
+              [(conn, heavy, period)] * 3)
+
+        # Leave the data set as it was for the next run
+        conn.execute("DELETE FROM expense_rows WHERE description = ?", (BENCH_USER_PREFIX + 'expense',))
+        for table in ('users', 'categories', 'data_versions'):
+            conn.execute(f"DELETE FROM {table} WHERE {BENCH_USER}", (BENCH_USER_PREFIX,))
+        conn.commit()
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'database': path,
+            'users': user_count,
+            'expenses': expense_count,
+            'samples': samples,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+# Print p50 changes against an earlier results file
+def compare(baseline, current, threshold=0.10):
+    regressions = 0
+    for name, stats in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        change = (stats['p50_ms'] - before['p50_ms']) / before['p50_ms'] if before['p50_ms'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{name:32s} {before['p50_ms']:10.3f} -> {stats['p50_ms']:10.3f} ms ({change:+.1%}){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the tracker's hot paths against a generated database.")
+    parser.add_argument('--db', required=True, help="database built by benchmarks.generate")
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against an earlier results file")
+    args = parser.parse_args(argv)
+
+    result = run(args.db, args.samples, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(json.load(f), result) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import date
+
+import db
+import writer
+from benchmarks.run import BENCH_USER_PREFIX, summarize
+
+DESCRIPTION = BENCH_USER_PREFIX + 'write'
+
+# One Add Expense click as pages did it before the write queue: borrow a pooled
+# connection, insert and commit
+def _commit_per_write(username, day):
+    with db.connection() as conn:
+        conn.execute(db.INSERT_EXPENSE, db.expense_params(username, 12.5, 'Food', day, DESCRIPTION))
+        conn.commit()
+
+def _queued_write(username, day):
+    writer.add_expense(username, 12.5, 'Food', day, DESCRIPTION).result()
+
+MODES = {'commit': _commit_per_write, 'queue': _queued_write}
+
+# `sessions` threads each make `writes` writes back to back; returns throughput
+# and per-write latency
+def run_mode(mode, sessions, writes):
+    write = MODES[mode]
+    latencies = [[] for _ in range(sessions)]
+    day = date.today()
+    start = threading.Barrier(sessions + 1)
+
+    with db.connection() as conn:
+        usernames = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY id LIMIT ?", (sessions,))]
+
+    def session(index):
+        username = usernames[index % len(usernames)]
+        start.wait()
+        for _ in range(writes):
+            started = time.perf_counter()
+            write(username, day)
+            latencies[index].append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    result = summarize([ms for session_latencies in latencies for ms in session_latencies])
+    result['writes_per_s'] = round(sessions * writes / elapsed, 1)
+    return result
+
+def run(path, sessions_list=(1, 8, 32), writes=200, log=print):
+    db.use_database(path)
+    results = {}
+    try:
+        for sessions in sessions_list:
+            for mode in MODES:
+                name = f"{mode}.{sessions}_sessions"
+                results[name] = run_mode(mode, sessions, writes)
+                log(f"{name:24s} {results[name]['writes_per_s']:10.1f} writes/s   "
+                    f"p50 {results[name]['p50_ms']:8.3f} ms   p95 {results[name]['p95_ms']:8.3f} ms")
+        group = writer.get_writer()
+        log(f"queue committed {group.writes} writes in {group.batches} transactions")
+    finally:
+        with db.connection() as conn:
+            conn.execute("DELETE FROM expense_rows WHERE description = ?", (DESCRIPTION,))
+            conn.commit()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-click commits with the group-commit write queue.")
+    parser.add_argument('--db', required=True, help="database built by benchmarks.generate")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--writes', type=int, default=200, help="writes per session")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.db, args.sessions, args.writes, log=lambda message: print(message, file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+import db
+
+QUERY_CACHE_SIZE = 4096
+
+_MISSING = object()
+
+# Bounded least-recently-used map, safe to share between sessions. By default
+# maxsize counts entries; pass weigh (e.g. len) to bound the total weight instead.
+class LRUCache:
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, weigh=None):
+        self.maxsize = maxsize
+        self.weigh = weigh or (lambda value: 1)
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        weight = self.weigh(value)
+        if weight > self.maxsize:
+            return
+        with self._lock:
+            old = self._data.pop(key, _MISSING)
+            if old is not _MISSING:
+                self.weight -= self.weigh(old)
+            self._data[key] = value
+            self.weight += weight
+            while self.weight > self.maxsize:
+                _, evicted = self._data.popitem(last=False)
+                self.weight -= self.weigh(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
+
+# Results shared by every session in the process
+_results = LRUCache()
+
+# Query results for one user, keyed on the user's data version. Any write to the
+# user's rows bumps the version (see the data_versions triggers in db.py), so
+# stale entries are simply never looked up again and age out of the LRU.
+class UserCache:
+    def __init__(self, conn, username, results=_results):
+        self.conn = conn
+        self.username = username
+        self.results = results
+        self.refresh()
+
+    # Re-read the data version; call after committing a write
+    def refresh(self):
+        self.version = db.data_version(self.conn, self.username)
+
+    def get(self, query, *args):
+        key = (self.username, self.version, query.__module__, query.__qualname__, args)
+        value = self.results.get(key, _MISSING)
+        if value is _MISSING:
+            value = query(self.conn, self.username, *args)
+            self.results.put(key, value)
+        return value
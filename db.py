@@ -0,0 +1,847 @@
+import difflib
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import instrumentation
+
+DB_PATH = os.environ.get('EXPENSE_TRACKER_DB', './data/expense_tracker.db')
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+
+# Open a connection tuned for many concurrent readers and a single writer.
+# WAL lets readers keep going while a write is in progress, and busy_timeout
+# makes writers wait for the lock instead of failing with "database is locked".
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=CACHED_STATEMENTS, factory=instrumentation.connection_factory())
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    attach_archive(conn, path)
+    return conn
+
+# Fixed-size pool of connections shared by every session in the process
+class ConnectionPool:
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                conn = connect(self.path)
+                self._opened += 1
+                return conn
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+# Point the process at another database file, closing the current pool
+def use_database(path):
+    global DB_PATH, _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        DB_PATH = path
+        _pool = None
+
+# Borrow a pooled connection: `with db.connection() as conn: ...`
+def connection():
+    return get_pool().connection()
+
+# Database setup
+def init_db():
+    with connection() as conn:
+        _create_tables(conn)
+        migrate_db(conn)
+        attach_archive(conn)
+
+def _create_tables(conn):
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        password TEXT,
+        name TEXT,
+        email TEXT
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS categories (
+        username TEXT,
+        category TEXT,
+        PRIMARY KEY (username, category)
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        amount REAL,
+        category TEXT,
+        date TEXT,
+        description TEXT
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS wishlist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        item TEXT,
+        purchased INTEGER
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS goals (
+        username TEXT,
+        year INTEGER,
+        month INTEGER,
+        goal_amount REAL,
+        PRIMARY KEY (username, year, month)
+    )''')
+    conn.commit()
+
+# Triggers bumping data_versions on every write to `table`. `key` is the column
+# naming the row's owner and `owner` produces their username; {row} stands for
+# NEW or OLD.
+def _version_triggers(table, key='username', owner="VALUES ({row}.username, 1)"):
+    return [f'''CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+            WHEN {row}.{key} IS NOT NULL
+        BEGIN
+            INSERT INTO data_versions (username, version) {owner.format(row=row)}
+            ON CONFLICT (username) DO UPDATE SET version = version + 1;
+        END''' for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))]
+
+# Schema migrations, applied in order on top of the base tables above.
+# The number of applied migrations is tracked in PRAGMA user_version.
+MIGRATIONS = [
+    # 1: composite indexes for per-user date range lookups
+    [
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (username, date)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_category_date ON expenses (username, category, date)",
+        "CREATE INDEX IF NOT EXISTS idx_wishlist_user_purchased ON wishlist (username, purchased)",
+    ],
+    # 2: per-user monthly totals by category, kept current by triggers on expenses
+    [
+        '''CREATE TABLE IF NOT EXISTS monthly_category_totals (
+            username TEXT NOT NULL,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, month, category)
+        ) WITHOUT ROWID''',
+        '''INSERT INTO monthly_category_totals (username, month, category, total, count)
+            SELECT username, substr(date, 1, 7), category, SUM(COALESCE(amount, 0)), COUNT(*)
+            FROM expenses
+            WHERE username IS NOT NULL AND category IS NOT NULL AND date IS NOT NULL
+            GROUP BY username, substr(date, 1, 7), category''',
+        '''CREATE TRIGGER IF NOT EXISTS expenses_totals_insert AFTER INSERT ON expenses
+            WHEN NEW.username IS NOT NULL AND NEW.category IS NOT NULL AND NEW.date IS NOT NULL
+        BEGIN
+            INSERT INTO monthly_category_totals (username, month, category, total, count)
+            VALUES (NEW.username, substr(NEW.date, 1, 7), NEW.category, COALESCE(NEW.amount, 0), 1)
+            ON CONFLICT (username, month, category)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS expenses_totals_delete AFTER DELETE ON expenses
+            WHEN OLD.username IS NOT NULL AND OLD.category IS NOT NULL AND OLD.date IS NOT NULL
+        BEGIN
+            UPDATE monthly_category_totals
+            SET total = total - COALESCE(OLD.amount, 0), count = count - 1
+            WHERE username = OLD.username AND month = substr(OLD.date, 1, 7) AND category = OLD.category;
+            DELETE FROM monthly_category_totals
+            WHERE username = OLD.username AND month = substr(OLD.date, 1, 7) AND category = OLD.category
+                AND count <= 0;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS expenses_totals_update
+            AFTER UPDATE OF username, amount, category, date ON expenses
+        BEGIN
+            UPDATE monthly_category_totals
+            SET total = total - COALESCE(OLD.amount, 0), count = count - 1
+            WHERE username = OLD.username AND month = substr(OLD.date, 1, 7) AND category = OLD.category;
+            DELETE FROM monthly_category_totals
+            WHERE username = OLD.username AND month = substr(OLD.date, 1, 7) AND category = OLD.category
+                AND count <= 0;
+            INSERT INTO monthly_category_totals (username, month, category, total, count)
+            SELECT NEW.username, substr(NEW.date, 1, 7), NEW.category, COALESCE(NEW.amount, 0), 1
+            WHERE NEW.username IS NOT NULL AND NEW.category IS NOT NULL AND NEW.date IS NOT NULL
+            ON CONFLICT (username, month, category)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END''',
+    ],
+    # 3: per-user data version, bumped by every write so cached query results
+    # can be keyed on it instead of being invalidated by hand
+    [
+        '''CREATE TABLE IF NOT EXISTS data_versions (
+            username TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID''',
+        *_version_triggers('expenses'),
+        *_version_triggers('wishlist'),
+        *_version_triggers('categories'),
+        *_version_triggers('goals'),
+    ],
+    # 4: full-text indexes over expense descriptions and wishlist items
+    lambda conn: _create_search_indexes(conn),
+    # 5: compact expense rows (see COMPACT_LAYOUT)
+    lambda conn: _compact_expenses(conn),
+    # 6: closed months whose rows have moved to the archive database (see
+    # ARCHIVE_SCHEMA); a batch's archived rows are only read once it is listed here
+    [
+        '''CREATE TABLE IF NOT EXISTS archived_batches (
+            batch INTEGER PRIMARY KEY,
+            month TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            archived_at TEXT NOT NULL
+        )''',
+    ],
+    # 7: index on day alone, so archive runs find closed months without
+    # scanning every user's rows
+    [
+        "CREATE INDEX IF NOT EXISTS idx_expense_rows_day ON expense_rows (day)",
+    ],
+]
+
+# FTS5 indexes are external-content tables over expenses and wishlist, so the
+# text isn't stored twice; triggers keep them in step with the base tables.
+# Expenses index the username too, so one MATCH narrows to a user's rows.
+# Wishlist items use the trigram tokenizer, which also finds candidates for
+# partial and misspelled names. SQLite builds without FTS5 skip this and
+# searches fall back to LIKE.
+SEARCH_INDEXES = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+        username, description, content='expenses', content_rowid='id', prefix='2 3'
+    )''',
+    "INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')",
+    '''CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+        INSERT INTO expenses_fts (rowid, username, description) VALUES (NEW.id, NEW.username, NEW.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, username, description)
+        VALUES ('delete', OLD.id, OLD.username, OLD.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF username, description ON expenses BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, username, description)
+        VALUES ('delete', OLD.id, OLD.username, OLD.description);
+        INSERT INTO expenses_fts (rowid, username, description) VALUES (NEW.id, NEW.username, NEW.description);
+    END''',
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS wishlist_fts USING fts5(
+        item, content='wishlist', content_rowid='id', tokenize='trigram'
+    )''',
+    "INSERT INTO wishlist_fts (wishlist_fts) VALUES ('rebuild')",
+    '''CREATE TRIGGER IF NOT EXISTS wishlist_fts_insert AFTER INSERT ON wishlist BEGIN
+        INSERT INTO wishlist_fts (rowid, item) VALUES (NEW.id, NEW.item);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS wishlist_fts_delete AFTER DELETE ON wishlist BEGIN
+        INSERT INTO wishlist_fts (wishlist_fts, rowid, item) VALUES ('delete', OLD.id, OLD.item);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS wishlist_fts_update AFTER UPDATE OF item ON wishlist BEGIN
+        INSERT INTO wishlist_fts (wishlist_fts, rowid, item) VALUES ('delete', OLD.id, OLD.item);
+        INSERT INTO wishlist_fts (rowid, item) VALUES (NEW.id, NEW.item);
+    END''',
+]
+
+def fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+def _create_search_indexes(conn):
+    if fts5_available(conn):
+        for statement in SEARCH_INDEXES:
+            conn.execute(statement)
+
+# Expenses move to expense_rows, which stores an integer user id, an integer
+# category id, the date as days since 1970-01-01 and the amount in whole
+# cents, instead of repeating the username, category name and ISO date text
+# on every row and in every index. Users and categories are rebuilt with
+# integer ids for those columns to refer to; expense ids are kept, so the
+# search index stays valid. `expenses` becomes a view with the old columns,
+# writable through INSTEAD OF triggers, and the summary, version and search
+# triggers move to expense_rows. 2440587.5 is the Julian day of 1970-01-01.
+COMPACT_LAYOUT = [
+    '''CREATE TABLE users_compact (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT,
+        name TEXT,
+        email TEXT
+    )''',
+    '''INSERT INTO users_compact (username, password, name, email)
+        SELECT username, password, name, email FROM users WHERE username IS NOT NULL''',
+    # Owners of expenses without an account keep their rows (they can't log in)
+    '''INSERT OR IGNORE INTO users_compact (username)
+        SELECT DISTINCT username FROM expenses WHERE username IS NOT NULL''',
+    "DROP TABLE users",
+    "ALTER TABLE users_compact RENAME TO users",
+    '''CREATE TABLE categories_compact (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        category TEXT,
+        UNIQUE (username, category)
+    )''',
+    "INSERT INTO categories_compact (username, category) SELECT username, category FROM categories",
+    '''INSERT OR IGNORE INTO categories_compact (username, category)
+        SELECT DISTINCT username, category FROM expenses WHERE username IS NOT NULL AND category IS NOT NULL''',
+    "DROP TABLE categories",
+    "ALTER TABLE categories_compact RENAME TO categories",
+    *_version_triggers('categories'),
+    '''CREATE TABLE expense_rows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER REFERENCES users (id),
+        category_id INTEGER REFERENCES categories (id),
+        day INTEGER,
+        cents INTEGER,
+        description TEXT
+    )''',
+    '''INSERT INTO expense_rows (id, user_id, category_id, day, cents, description)
+        SELECT e.id, u.id, c.id, CAST(julianday(e.date) - 2440587.5 AS INTEGER),
+            CAST(round(e.amount * 100) AS INTEGER), e.description
+        FROM expenses AS e
+        LEFT JOIN users AS u ON u.username = e.username
+        LEFT JOIN categories AS c ON c.username = e.username AND c.category = e.category
+        ORDER BY e.id''',
+    '''UPDATE sqlite_sequence SET seq = max(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'expenses'))
+        WHERE name = 'expense_rows' ''',
+    "DROP TABLE expenses",
+    "CREATE INDEX idx_expense_rows_user_day ON expense_rows (user_id, day)",
+    "CREATE INDEX idx_expense_rows_user_category_day ON expense_rows (user_id, category_id, day)",
+    '''CREATE VIEW expenses (id, username, amount, category, date, description) AS
+        SELECT e.id, u.username, e.cents / 100.0, c.category, date(e.day + 2440587.5), e.description
+        FROM expense_rows AS e
+        LEFT JOIN users AS u ON u.id = e.user_id
+        LEFT JOIN categories AS c ON c.id = e.category_id''',
+    '''CREATE TRIGGER expenses_insert INSTEAD OF INSERT ON expenses BEGIN
+        INSERT OR IGNORE INTO categories (username, category)
+            SELECT NEW.username, NEW.category WHERE NEW.username IS NOT NULL AND NEW.category IS NOT NULL;
+        INSERT INTO expense_rows (id, user_id, category_id, day, cents, description) VALUES (
+            NEW.id,
+            (SELECT id FROM users WHERE username = NEW.username),
+            (SELECT id FROM categories WHERE username = NEW.username AND category = NEW.category),
+            CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+            CAST(round(NEW.amount * 100) AS INTEGER),
+            NEW.description);
+    END''',
+    '''CREATE TRIGGER expenses_update INSTEAD OF UPDATE ON expenses BEGIN
+        INSERT OR IGNORE INTO categories (username, category)
+            SELECT NEW.username, NEW.category WHERE NEW.username IS NOT NULL AND NEW.category IS NOT NULL;
+        UPDATE expense_rows SET
+            id = NEW.id,
+            user_id = (SELECT id FROM users WHERE username = NEW.username),
+            category_id = (SELECT id FROM categories WHERE username = NEW.username AND category = NEW.category),
+            day = CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+            cents = CAST(round(NEW.amount * 100) AS INTEGER),
+            description = NEW.description
+        WHERE id = OLD.id;
+    END''',
+    '''CREATE TRIGGER expenses_delete INSTEAD OF DELETE ON expenses BEGIN
+        DELETE FROM expense_rows WHERE id = OLD.id;
+    END''',
+    '''CREATE TRIGGER expense_rows_totals_insert AFTER INSERT ON expense_rows
+        WHEN NEW.user_id IS NOT NULL AND NEW.category_id IS NOT NULL AND NEW.day IS NOT NULL
+    BEGIN
+        INSERT INTO monthly_category_totals (username, month, category, total, count)
+        SELECT u.username, strftime('%Y-%m', NEW.day + 2440587.5), c.category, COALESCE(NEW.cents, 0) / 100.0, 1
+        FROM users AS u, categories AS c WHERE u.id = NEW.user_id AND c.id = NEW.category_id
+        ON CONFLICT (username, month, category)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END''',
+    '''CREATE TRIGGER expense_rows_totals_delete AFTER DELETE ON expense_rows
+        WHEN OLD.user_id IS NOT NULL AND OLD.category_id IS NOT NULL AND OLD.day IS NOT NULL
+    BEGIN
+        UPDATE monthly_category_totals
+        SET total = total - COALESCE(OLD.cents, 0) / 100.0, count = count - 1
+        WHERE username = (SELECT username FROM users WHERE id = OLD.user_id)
+            AND month = strftime('%Y-%m', OLD.day + 2440587.5)
+            AND category = (SELECT category FROM categories WHERE id = OLD.category_id);
+        DELETE FROM monthly_category_totals
+        WHERE username = (SELECT username FROM users WHERE id = OLD.user_id)
+            AND month = strftime('%Y-%m', OLD.day + 2440587.5)
+            AND category = (SELECT category FROM categories WHERE id = OLD.category_id)
+            AND count <= 0;
+    END''',
+    '''CREATE TRIGGER expense_rows_totals_update
+        AFTER UPDATE OF user_id, cents, category_id, day ON expense_rows
+    BEGIN
+        UPDATE monthly_category_totals
+        SET total = total - COALESCE(OLD.cents, 0) / 100.0, count = count - 1
+        WHERE username = (SELECT username FROM users WHERE id = OLD.user_id)
+            AND month = strftime('%Y-%m', OLD.day + 2440587.5)
+            AND category = (SELECT category FROM categories WHERE id = OLD.category_id);
+        DELETE FROM monthly_category_totals
+        WHERE username = (SELECT username FROM users WHERE id = OLD.user_id)
+            AND month = strftime('%Y-%m', OLD.day + 2440587.5)
+            AND category = (SELECT category FROM categories WHERE id = OLD.category_id)
+            AND count <= 0;
+        INSERT INTO monthly_category_totals (username, month, category, total, count)
+        SELECT u.username, strftime('%Y-%m', NEW.day + 2440587.5), c.category, COALESCE(NEW.cents, 0) / 100.0, 1
+        FROM users AS u, categories AS c
+        WHERE u.id = NEW.user_id AND c.id = NEW.category_id AND NEW.day IS NOT NULL
+        ON CONFLICT (username, month, category)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END''',
+    *_version_triggers('expense_rows', 'user_id', "SELECT username, 1 FROM users WHERE id = {row}.user_id"),
+]
+
+COMPACT_SEARCH_TRIGGERS = [
+    '''CREATE TRIGGER expense_rows_fts_insert AFTER INSERT ON expense_rows BEGIN
+        INSERT INTO expenses_fts (rowid, username, description)
+        VALUES (NEW.id, (SELECT username FROM users WHERE id = NEW.user_id), NEW.description);
+    END''',
+    '''CREATE TRIGGER expense_rows_fts_delete AFTER DELETE ON expense_rows BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, username, description)
+        VALUES ('delete', OLD.id, (SELECT username FROM users WHERE id = OLD.user_id), OLD.description);
+    END''',
+    '''CREATE TRIGGER expense_rows_fts_update AFTER UPDATE OF id, user_id, description ON expense_rows BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, username, description)
+        VALUES ('delete', OLD.id, (SELECT username FROM users WHERE id = OLD.user_id), OLD.description);
+        INSERT INTO expenses_fts (rowid, username, description)
+        VALUES (NEW.id, (SELECT username FROM users WHERE id = NEW.user_id), NEW.description);
+    END''',
+]
+
+def _compact_expenses(conn):
+    for statement in COMPACT_LAYOUT:
+        conn.execute(statement)
+    if has_search_index(conn):
+        for statement in COMPACT_SEARCH_TRIGGERS:
+            conn.execute(statement)
+
+# Expenses from closed months live in a second database file next to the main
+# one, attached to every connection as `archive`. Archived rows keep the
+# expense_rows columns plus the batch that moved them; a batch is one month
+# moved by one archive run (see archive.py), stored with its category totals.
+# Only the (user_id, day) index is kept, so the archive is smaller than the
+# live table it came from.
+ARCHIVE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS archive.expense_rows (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        category_id INTEGER,
+        day INTEGER,
+        cents INTEGER,
+        description TEXT,
+        batch INTEGER NOT NULL
+    )''',
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_rows_user_day ON expense_rows (user_id, day)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_rows_batch ON expense_rows (batch)",
+    '''CREATE TABLE IF NOT EXISTS archive.archive_batches (
+        batch INTEGER PRIMARY KEY,
+        month TEXT NOT NULL,
+        done INTEGER NOT NULL DEFAULT 0
+    )''',
+    '''CREATE TABLE IF NOT EXISTS archive.monthly_category_totals (
+        batch INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (batch, username, month, category)
+    ) WITHOUT ROWID''',
+]
+
+# Full-text index over archived descriptions, kept by triggers like
+# expenses_fts. The archive has no usernames, so rows are indexed under their
+# user id, and searches name the owner with `user_id : "<id>"`.
+ARCHIVE_SEARCH_INDEX = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS archive.expenses_fts USING fts5(
+        user_id, description, content='expense_rows', content_rowid='id', prefix='2 3'
+    )''',
+    "INSERT INTO archive.expenses_fts (expenses_fts) VALUES ('rebuild')",
+    '''CREATE TRIGGER IF NOT EXISTS archive.expense_rows_fts_insert AFTER INSERT ON expense_rows BEGIN
+        INSERT INTO expenses_fts (rowid, user_id, description) VALUES (NEW.id, NEW.user_id, NEW.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS archive.expense_rows_fts_delete AFTER DELETE ON expense_rows BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, user_id, description)
+        VALUES ('delete', OLD.id, OLD.user_id, OLD.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS archive.expense_rows_fts_update
+        AFTER UPDATE OF id, user_id, description ON expense_rows
+    BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, user_id, description)
+        VALUES ('delete', OLD.id, OLD.user_id, OLD.description);
+        INSERT INTO expenses_fts (rowid, user_id, description) VALUES (NEW.id, NEW.user_id, NEW.description);
+    END''',
+]
+
+# Every expense, live and archived, with the expense_rows columns. Readers of
+# date ranges query this per-connection view instead of expense_rows. Archived
+# rows count only once main.archived_batches lists their batch, which is
+# committed together with the deletion of the live copies.
+EXPENSE_HISTORY = '''CREATE TEMP VIEW expense_history AS
+    SELECT id, user_id, category_id, day, cents, description FROM main.expense_rows
+    UNION ALL
+    SELECT id, user_id, category_id, day, cents, description FROM archive.expense_rows
+    WHERE batch IN (SELECT batch FROM main.archived_batches)'''
+LIVE_EXPENSE_HISTORY = '''CREATE TEMP VIEW expense_history AS
+    SELECT id, user_id, category_id, day, cents, description FROM main.expense_rows'''
+
+# Columns of an ordered history read, before history_rows() picks from them
+HISTORY_COLUMNS = ("e.day AS day, e.id AS id, date(e.day + 2440587.5) AS date, c.category AS category, "
+                   "e.cents / 100.0 AS amount, e.description AS description")
+
+# The tables expense_history reads, as (table, condition its rows must meet,
+# column naming the owner in the database's expenses_fts or None without one):
+# the live rows, then the archived ones when the view includes them
+def _history_sources(conn):
+    view = conn.execute("SELECT sql FROM temp.sqlite_master WHERE name = 'expense_history'").fetchone()[0]
+    sources = [('main.expense_rows', None, 'username' if has_search_index(conn) else None)]
+    if 'archive.expense_rows' in view:
+        sources.append(('archive.expense_rows', "e.batch IN (SELECT batch FROM main.archived_batches)",
+                        'user_id' if has_archive_search_index(conn) else None))
+    return sources
+
+# Condition and parameter finding `text` in the descriptions of `table`'s rows,
+# through its database's full-text index when it has one, else with LIKE
+def _text_filter(conn, table, indexed_by, username, text):
+    if indexed_by is None:
+        return ("e.description LIKE ? ESCAPE '\\'",
+                '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+    owner = username if indexed_by == 'username' else user_id(conn, username)
+    return (f"e.id IN (SELECT rowid FROM {table.split('.')[0]}.expenses_fts WHERE expenses_fts MATCH ?)",
+            expense_search_query(owner, text, indexed_by))
+
+# Live and archived expenses matching `where` (a condition on `e`, the expense
+# rows, binding `params`) in (day, id) order, as `columns` picked from
+# HISTORY_COLUMNS by name. An ORDER BY over the expense_history view sorts every
+# matching row before returning the first, so ordered reads use this instead:
+# each table is queried on its own and the compound SELECT merges them in
+# (user_id, day) index order, reading only as many rows as are fetched. With
+# `text`, only descriptions matching it for `username` are returned (see
+# expense_search_query).
+def history_rows(conn, columns, where, params, descending=False, limit=None, text=None, username=None):
+    direction = " DESC" if descending else ""
+    branches, bound = [], []
+    for table, condition, indexed_by in _history_sources(conn):
+        branch = (f"SELECT {HISTORY_COLUMNS} FROM {table} AS e LEFT JOIN categories AS c "
+                  f"ON c.id = e.category_id WHERE {where}" + (f" AND {condition}" if condition else ""))
+        bound.extend(params)
+        if text:
+            clause, value = _text_filter(conn, table, indexed_by, username, text)
+            branch += f" AND {clause}"
+            bound.append(value)
+        branches.append(branch)
+    query = " UNION ALL ".join(branches) + f" ORDER BY day{direction}, id{direction}"
+    if limit is not None:
+        query += " LIMIT ?"
+        bound.append(limit)
+    return conn.execute(f"SELECT {columns} FROM ({query})", bound)
+
+def archive_path(path=None):
+    root, extension = os.path.splitext(path or DB_PATH)
+    return f"{root}-archive{extension or '.db'}"
+
+# Attach the archive database and (re)create the expense_history view. Writable
+# connections create the archive file if needed; read-only ones attach it only
+# if it exists. Safe to call again, e.g. after migrations have run.
+def attach_archive(conn, path=None, readonly=False):
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if 'archive' not in attached:
+        location = archive_path(path)
+        if not readonly:
+            conn.execute("ATTACH DATABASE ? AS archive", (location,))
+            conn.execute("PRAGMA archive.journal_mode = WAL")
+            conn.execute("PRAGMA archive.synchronous = NORMAL")
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement)
+            if not has_archive_search_index(conn) and fts5_available(conn):
+                for statement in ARCHIVE_SEARCH_INDEX:
+                    conn.execute(statement)
+                conn.commit()
+            attached.add('archive')
+        elif os.path.exists(location):
+            conn.execute("ATTACH DATABASE ? AS archive", (f"file:{quote(os.path.abspath(location))}?mode=ro",))
+            attached.add('archive')
+    tables = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master "
+                                             "WHERE name IN ('expense_rows', 'archived_batches')")}
+    if 'expense_rows' in tables:
+        conn.execute("DROP VIEW IF EXISTS temp.expense_history")
+        archived = 'archive' in attached and 'archived_batches' in tables
+        conn.execute(EXPENSE_HISTORY if archived else LIVE_EXPENSE_HISTORY)
+
+# Apply pending migrations, up to and including number `target` if given
+def migrate_db(conn, target=None):
+    # BEGIN IMMEDIATE takes the write lock up front, so two processes starting
+    # at once can't both apply the same migration
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:target], start=version + 1):
+            if callable(migration):
+                migration(conn)
+            else:
+                for statement in migration:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+# Mapping between the app's values and the compact expense_rows columns
+UNIX_EPOCH = date(1970, 1, 1)
+
+def to_day(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return (value - UNIX_EPOCH).days
+
+def to_cents(amount):
+    return round(amount * 100)
+
+# Half-open [start, end) day numbers for an inclusive date range
+def day_numbers(start_date, end_date):
+    return to_day(start_date), to_day(end_date) + 1
+
+# Expense columns as the pages see them; `e` is expense_rows (or
+# expense_history), `c` categories
+EXPENSE_COLUMNS = "e.id, date(e.day + 2440587.5), c.category, e.cents / 100.0, e.description"
+USER_ID = "(SELECT id FROM users WHERE username = ?)"
+
+# users.id for a username (None if unknown). Queries on expense_history bind
+# the id itself: SQLite won't push a condition holding a subquery such as
+# USER_ID into the view's branches, and would scan both tables instead.
+def user_id(conn, username):
+    row = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else None
+
+# Insert one expense given the values the pages use; pair with expense_params()
+INSERT_EXPENSE = ("INSERT INTO expense_rows (user_id, category_id, day, cents, description) "
+                  f"VALUES ({USER_ID}, (SELECT id FROM categories WHERE username = ? AND category = ?), ?, ?, ?)")
+
+def expense_params(username, amount, category, day, description):
+    return (username, username, category, to_day(day), to_cents(amount), description)
+
+def _month_start(day):
+    return day.replace(day=1)
+
+def _next_month(day):
+    return date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+
+# Per-user data version; changes whenever any of the user's rows are written
+def data_version(conn, username):
+    row = conn.execute("SELECT version FROM data_versions WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else 0
+
+def get_categories(conn, username):
+    return [row[0] for row in conn.execute("SELECT category FROM categories WHERE username = ?", (username,))]
+
+def get_goal(conn, username, year, month):
+    row = conn.execute("SELECT goal_amount FROM goals WHERE username = ? AND year = ? AND month = ?",
+                       (username, year, month)).fetchone()
+    return row[0] if row else 0.0
+
+def get_wishlist(conn, username):
+    return conn.execute("SELECT item, purchased FROM wishlist WHERE username = ?", (username,)).fetchall()
+
+# Whether migration 4 built the FTS5 indexes (it skips them without FTS5)
+def has_search_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'expenses_fts'").fetchone() is not None
+
+# Whether the attached archive has its own expenses_fts (see ARCHIVE_SEARCH_INDEX)
+def has_archive_search_index(conn):
+    return conn.execute("SELECT 1 FROM archive.sqlite_master WHERE name = 'expenses_fts'").fetchone() is not None
+
+# Quote arbitrary text as an FTS5 string, so operators and punctuation in
+# user input are never parsed as query syntax
+def _fts_string(text):
+    return '"' + text.replace('"', '""') + '"'
+
+# FTS5 query for a user's expenses with a description word starting with each
+# search word, e.g. "cof lun" finds "lunch and coffee". `column` names the
+# owner: the username in the live index, the user id in the archive's.
+def expense_search_query(owner, text, column='username'):
+    words = ' '.join(_fts_string(word) + '*' for word in text.split())
+    return f"{column} : {_fts_string(str(owner))} AND description : ({words})"
+
+WISHLIST_MATCH_RATIO = 0.75
+
+# 1.0 for the same name, 0.9 when one starts with the other ("head" and
+# "headphones", "headphones sony" and "headphones"), otherwise how close the
+# spellings are
+def _wishlist_similarity(text, item):
+    text, item = text.casefold(), item.strip().casefold()
+    if text == item:
+        return 1.0
+    if min(len(text), len(item)) >= 3 and (item.startswith(text) or text.startswith(item)):
+        return 0.9
+    return difflib.SequenceMatcher(None, text, item).ratio()
+
+# The user's pending wishlist items as (id, item)
+def pending_wishlist(conn, username):
+    return conn.execute("SELECT id, item FROM wishlist WHERE username = ? AND purchased = 0", (username,)).fetchall()
+
+# The pending wishlist item an expense description most likely refers to, as
+# (id, item, exact), or None. Candidates are the user's pending items sharing
+# at least one trigram with the description, found through wishlist_fts; the
+# closest by _wishlist_similarity wins if it clears WISHLIST_MATCH_RATIO.
+# `exact` is true only when the names are the same ignoring case; anything
+# else is a guess ("coffee" for "coffee machine") for the user to confirm.
+def match_wishlist(conn, username, description):
+    text = description.strip().casefold()
+    if len(text) >= 3 and has_search_index(conn):
+        trigrams = {text[i:i + 3] for i in range(len(text) - 2)}
+        candidates = conn.execute(
+            "SELECT w.id, w.item FROM wishlist AS w CROSS JOIN wishlist_fts AS f ON f.rowid = w.id "
+            "WHERE w.username = ? AND w.purchased = 0 AND f.wishlist_fts MATCH ?",
+            (username, ' OR '.join(_fts_string(trigram) for trigram in trigrams))).fetchall()
+    else:
+        candidates = pending_wishlist(conn, username)
+    scored = [(_wishlist_similarity(text, item), item_id, item) for item_id, item in candidates if item]
+    if not scored:
+        return None
+    score, item_id, item = max(scored)
+    return (item_id, item, score == 1.0) if score >= WISHLIST_MATCH_RATIO else None
+
+BROWSE_COLUMNS = ['id', 'date', 'category', 'amount', 'description']
+
+# One page of a user's expenses, newest first, with every filter applied inside
+# SQLite. Pages use keyset pagination: `after` is the (date, id) of the last row
+# of the previous page, so each page is an index seek rather than an OFFSET scan.
+# Dates are inclusive; categories is a sequence of names; text finds descriptions
+# with words starting with each of its words (or containing it anywhere, on
+# SQLite builds without FTS5), in live and archived months alike.
+def browse_expenses(conn, username, start_date=None, end_date=None, categories=None,
+                    min_amount=None, max_amount=None, text=None, after=None, limit=50):
+    where = "e.user_id = ?"
+    params = [user_id(conn, username)]
+    if start_date is not None:
+        where += " AND e.day >= ?"
+        params.append(to_day(start_date))
+    if end_date is not None:
+        where += " AND e.day < ?"
+        params.append(to_day(end_date) + 1)
+    if categories:
+        where += (" AND e.category_id IN (SELECT id FROM categories WHERE username = ? "
+                  f"AND category IN ({', '.join('?' * len(categories))}))")
+        params.append(username)
+        params.extend(categories)
+    if min_amount is not None:
+        where += " AND e.cents >= ?"
+        params.append(to_cents(min_amount))
+    if max_amount is not None:
+        where += " AND e.cents <= ?"
+        params.append(to_cents(max_amount))
+    if after is not None:
+        where += " AND (e.day, e.id) < (?, ?)"
+        params.extend((to_day(after[0]), after[1]))
+    return history_rows(conn, ', '.join(BROWSE_COLUMNS), where, params, descending=True, limit=limit,
+                        text=text, username=username).fetchall()
+
+# Sum of the monthly goals from first_month through last_month (the day is ignored)
+def goal_total(conn, username, first_month, last_month):
+    row = conn.execute("SELECT COALESCE(SUM(goal_amount), 0) FROM goals "
+                       "WHERE username = ? AND year * 100 + month BETWEEN ? AND ?",
+                       (username, first_month.year * 100 + first_month.month,
+                        last_month.year * 100 + last_month.month)).fetchone()
+    return row[0]
+
+# Monthly totals, read from the monthly_category_totals summary table
+def month_total(conn, username, year, month):
+    row = conn.execute("SELECT COALESCE(SUM(total), 0) FROM monthly_category_totals WHERE username = ? AND month = ?",
+                       (username, f"{year}-{month:02d}")).fetchone()
+    return row[0]
+
+# (month, total) for each month with spending from first_month through
+# last_month (the day is ignored), months as 'YYYY-MM'
+def monthly_totals(conn, username, first_month, last_month):
+    return conn.execute("SELECT month, SUM(total) FROM monthly_category_totals WHERE username = ? "
+                        "AND month >= ? AND month <= ? GROUP BY month ORDER BY month",
+                        (username, first_month.strftime('%Y-%m'), last_month.strftime('%Y-%m'))).fetchall()
+
+def month_category_totals(conn, username, year, month):
+    return conn.execute("SELECT category, total FROM monthly_category_totals WHERE username = ? AND month = ? ORDER BY category",
+                        (username, f"{year}-{month:02d}")).fetchall()
+
+# Category totals for an inclusive date range. Whole months come from the summary
+# table; only the partial months at either edge are summed from raw expenses.
+def category_totals(conn, username, start_date, end_date):
+    start, end = day_numbers(start_date, end_date)
+    full_start = start_date if start_date.day == 1 else _next_month(start_date)
+    full_end = _month_start(end_date + timedelta(days=1))
+    owner = user_id(conn, username)
+    raw = ("SELECT c.category, e.cents / 100.0 AS amount FROM expense_history AS e "
+           "LEFT JOIN categories AS c ON c.id = e.category_id WHERE e.user_id = ? AND e.day >= ? AND e.day < ?")
+    if full_start >= full_end:
+        return conn.execute(f"SELECT category, SUM(amount) FROM ({raw}) GROUP BY category ORDER BY category",
+                            (owner, start, end)).fetchall()
+    return conn.execute(f'''SELECT category, SUM(total) FROM (
+            SELECT category, total FROM monthly_category_totals
+            WHERE username = ? AND month >= ? AND month < ?
+            UNION ALL
+            {raw}
+            UNION ALL
+            {raw}
+        ) GROUP BY category ORDER BY category''',
+        (username, full_start.strftime('%Y-%m'), full_end.strftime('%Y-%m'),
+         owner, start, to_day(full_start),
+         owner, to_day(full_end), end)).fetchall()
+
+# Password hashing
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# User authentication
+def authenticate(username, password):
+    with connection() as conn:
+        result = conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()
+    if result and result[0] == hash_password(password):
+        return True
+    return False
+
+# Add user with default categories
+def add_user(username, password, name, email):
+    with connection() as conn:
+        c = conn.cursor()
+        try:
+            c.execute("INSERT INTO users (username, password, name, email) VALUES (?, ?, ?, ?)",
+                        (username, hash_password(password), name, email))
+            default_categories = ['Food', 'Transport', 'Education', 'Rent', 'Entertainment', 'Others']
+            c.executemany("INSERT OR IGNORE INTO categories (username, category) VALUES (?, ?)",
+                            [(username, category) for category in default_categories])
+            conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
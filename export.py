@@ -0,0 +1,149 @@
+import argparse
+import csv
+import io
+import sys
+import zlib
+
+import db
+
+FETCH_SIZE = 10000      # rows per fetchmany / Parquet row group
+EXPORT_COLUMNS = ['date', 'category', 'amount', 'description']
+
+# Yield a user's expenses in (date, id) order as lists of up to fetch_size rows.
+# Dates are inclusive; either bound may be None for an open-ended range.
+def iter_expense_batches(conn, username, start_date=None, end_date=None, fetch_size=FETCH_SIZE):
+    where = "e.user_id = ?"
+    params = [db.user_id(conn, username)]
+    if start_date is not None:
+        where += " AND e.day >= ?"
+        params.append(db.to_day(start_date))
+    if end_date is not None:
+        where += " AND e.day < ?"
+        params.append(db.to_day(end_date) + 1)
+    cursor = db.history_rows(conn, ', '.join(EXPORT_COLUMNS), where, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+# Encoders turn row batches into a stream of bytes chunks
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def gzip_csv_chunks(batches):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in csv_chunks(batches):
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# Write-only file object that hands back whatever has been written since the last drain
+class _DrainBuffer(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+# Columnar Parquet, one row group per batch; needs the optional pyarrow package
+def parquet_chunks(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([('date', pa.string()), ('category', pa.string()),
+                        ('amount', pa.float64()), ('description', pa.string())])
+    sink = _DrainBuffer()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+# name -> (file extension, mime type, encoder)
+FORMATS = {
+    'csv': ('csv', 'text/csv', csv_chunks),
+    'csv.gz': ('csv.gz', 'application/gzip', gzip_csv_chunks),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', parquet_chunks),
+}
+
+def available_formats():
+    formats = ['csv', 'csv.gz']
+    try:
+        import pyarrow.parquet  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+    return formats
+
+def export_chunks(conn, username, start_date=None, end_date=None, file_format='csv'):
+    return FORMATS[file_format][2](iter_expense_batches(conn, username, start_date, end_date))
+
+def export_filename(username, start_date=None, end_date=None, file_format='csv'):
+    span = f"{start_date or 'start'}_{end_date or 'today'}"
+    return f"expenses_{username}_{span}.{FORMATS[file_format][0]}"
+
+# A whole export as bytes, for st.download_button's deferred `data` callable.
+# Streamlit holds the file in memory to serve it, so this download is built
+# in full rather than streamed; it borrows its own pooled connection because
+# it runs after the page that created the button has finished. The CLI below
+# streams instead.
+def export_file(username, start_date=None, end_date=None, file_format='csv'):
+    with db.connection() as conn:
+        return b''.join(export_chunks(conn, username, start_date, end_date, file_format))
+
+def main(argv=None):
+    from datetime import date
+
+    parser = argparse.ArgumentParser(description="Export a user's expense history.")
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--start', type=date.fromisoformat, help="first day, YYYY-MM-DD (default: all history)")
+    parser.add_argument('--end', type=date.fromisoformat, help="last day, YYYY-MM-DD (default: all history)")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    db.init_db()
+    with db.connection() as conn:
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for chunk in export_chunks(conn, args.user, args.start, args.end, args.format):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
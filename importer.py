@@ -0,0 +1,263 @@
+import argparse
+import csv
+import html
+import io
+import re
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import db
+
+CHUNK_SIZE = 5000          # rows per executemany batch and transaction
+DECIMAL_SEPARATORS = ('.', ',')
+MAX_ERRORS = 20            # rejected rows kept for the report
+DEFAULT_CATEGORY = 'Others'
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%d.%m.%Y', '%Y%m%d')
+# Dates written with slashes, such as 03/04/2024, in either day/month order
+SLASH_DATE_FORMATS = {'mdy': '%m/%d/%Y', 'dmy': '%d/%m/%Y'}
+DATE_ORDERS = ('auto',) + tuple(SLASH_DATE_FORMATS)
+
+# Header names accepted for each field, compared case-insensitively
+COLUMN_ALIASES = {
+    'date': ('date', 'transaction date', 'posted date', 'posting date', 'booking date'),
+    'amount': ('amount', 'debit', 'value', 'transaction amount'),
+    'category': ('category',),
+    'description': ('description', 'memo', 'name', 'payee', 'details', 'narrative'),
+}
+
+# Counters for one import run
+class ImportStats:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_skipped = 0
+        self.categories_created = []
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_imported / self.seconds if self.seconds else 0.0
+
+    def reject(self, line, reason):
+        self.rows_skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"row {line}: {reason}")
+
+    def summary(self):
+        return (f"Imported {self.rows_imported} of {self.rows_read} rows in {self.seconds:.1f}s "
+                f"({self.rows_per_second:,.0f} rows/s), skipped {self.rows_skipped}, "
+                f"created {len(self.categories_created)} categories")
+
+# Parsers yield raw (date, amount, category, description) string tuples, one per
+# transaction, reading the stream incrementally so memory stays flat.
+def parse_csv(stream):
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    index = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        index[field] = next((names.index(alias) for alias in aliases if alias in names), None)
+    if index['date'] is None or index['amount'] is None:
+        raise ValueError("CSV needs a date and an amount column, got: " + ", ".join(header))
+    columns = [index[field] for field in ('date', 'amount', 'category', 'description')]
+    for row in reader:
+        yield tuple(row[i] if i is not None and i < len(row) else '' for i in columns)
+
+def _ofx_tokens(stream, block_size=65536):
+    pending = ''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        parts = (pending + block).split('<')
+        pending = parts.pop()
+        for part in parts:
+            if part.strip():
+                yield part
+    if pending.strip():
+        yield pending
+
+# OFX/QFX statements, both the SGML (v1) and XML (v2) flavours
+def parse_ofx(stream):
+    transaction = None
+    for token in _ofx_tokens(stream):
+        tag, _, value = token.partition('>')
+        tag = tag.strip().upper()
+        if tag == 'STMTTRN':
+            transaction = {}
+        elif tag == '/STMTTRN':
+            if transaction is not None:
+                yield (transaction.get('DTPOSTED', '')[:8], transaction.get('TRNAMT', ''), '',
+                       transaction.get('NAME') or transaction.get('MEMO') or '')
+            transaction = None
+        elif transaction is not None and not tag.startswith('/'):
+            transaction[tag] = html.unescape(value.strip())
+
+PARSERS = {'csv': parse_csv, 'ofx': parse_ofx, 'qfx': parse_ofx}
+
+def _strptime(text, formats):
+    for fmt in formats:
+        try:
+            yield datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+
+# Statements repeat the same few dates many times, so parsed dates are memoised.
+# Slashed dates are read in `date_order` ('mdy' or 'dmy'); with 'auto', one
+# that reads differently either way, such as 03/04/2024, is rejected.
+@lru_cache(maxsize=4096)
+def _parse_date(text, date_order='auto'):
+    text = text.strip()
+    for parsed in _strptime(text, DATE_FORMATS):
+        return parsed
+    formats = SLASH_DATE_FORMATS.values() if date_order == 'auto' else [SLASH_DATE_FORMATS[date_order]]
+    readings = set(_strptime(text, formats))
+    if len(readings) > 1:
+        raise ValueError(f"ambiguous date {text!r}; choose a day/month order")
+    if not readings:
+        raise ValueError(f"unrecognised date {text!r}")
+    return readings.pop()
+
+# An amount such as "-1,234.50", "(12.00)", "$5" or "1.234,50 EUR" (with a
+# decimal comma). Digits may be grouped in threes by the other separator, a
+# space or an apostrophe; a currency symbol or three-letter code may come
+# before or after. Anything else is rejected rather than guessed at, so
+# "12,50" read with a decimal point is an error, not 1250.
+@lru_cache(maxsize=None)
+def _amount_pattern(decimal):
+    group = "[" + re.escape(',' if decimal == '.' else '.') + " \u00a0']"
+    currency = r"(?:[^\W\d_]{3}|[^\w\s().,+\-'])?"
+    return re.compile(rf"(?P<open>\()?(?P<sign>[+-])?\s*{currency}\s*(?P<inner_sign>[+-])?"
+                      rf"(?P<whole>\d{{1,3}}(?:{group}\d{{3}})+|\d+)(?:{re.escape(decimal)}(?P<fraction>\d+))?"
+                      rf"\s*{currency}(?P<close>\))?")
+
+def _parse_amount(text, decimal='.'):
+    match = _amount_pattern(decimal).fullmatch(text.strip())
+    if (match is None or bool(match['open']) != bool(match['close'])
+            or (match['sign'] and match['inner_sign'])):
+        raise ValueError(f"unrecognised amount {text!r}")
+    amount = float(re.sub(r'\D', '', match['whole']) + '.' + (match['fraction'] or '0'))
+    negative = bool(match['open']) != ((match['sign'] or match['inner_sign']) == '-')
+    return -amount if negative else amount
+
+# Load parsed records for one user. Rows go in with executemany in batches of
+# chunk_size, each committed on its own: the write lock is held for one batch
+# (well under db.BUSY_TIMEOUT_MS) and never while the input is being read, so
+# the writer thread's group commits get in between batches. Categories are matched to the
+# user's existing ones case-insensitively (after applying category_map) and any
+# that are missing are created. With debits_only, only negative amounts are
+# imported, sign-flipped, as bank exports list spending as debits. Amounts are
+# read with `decimal` as the decimal separator ('.' or ',') and slashed dates
+# in `date_order` (see _parse_date).
+def import_expenses(conn, username, records, category_map=None, debits_only=False, decimal='.',
+                    date_order='auto', chunk_size=CHUNK_SIZE, on_progress=None):
+    stats = ImportStats()
+    started = time.perf_counter()
+    category_map = {key.lower(): value for key, value in (category_map or {}).items()}
+    categories = {name.lower(): name for name in db.get_categories(conn, username)}
+    new_categories = []
+    batch = []
+
+    def flush():
+        if new_categories:
+            conn.executemany("INSERT OR IGNORE INTO categories (username, category) VALUES (?, ?)", new_categories)
+            stats.categories_created.extend(category for _, category in new_categories)
+            new_categories.clear()
+        conn.executemany(db.INSERT_EXPENSE, batch)
+        conn.commit()
+        stats.rows_imported += len(batch)
+        batch.clear()
+        stats.seconds = time.perf_counter() - started
+        if on_progress:
+            on_progress(stats)
+
+    try:
+        for line, (raw_date, raw_amount, raw_category, description) in enumerate(records, start=2):
+            stats.rows_read += 1
+            try:
+                expense_date = _parse_date(raw_date, date_order)
+                amount = _parse_amount(raw_amount, decimal)
+            except ValueError as e:
+                stats.reject(line, str(e))
+                continue
+            if debits_only:
+                if amount >= 0:
+                    stats.rows_skipped += 1
+                    continue
+                amount = -amount
+            if amount <= 0:
+                stats.reject(line, f"amount must be positive, got {raw_amount!r}")
+                continue
+            description = description.strip()
+            if not description:
+                stats.reject(line, "missing description")
+                continue
+            name = raw_category.strip()
+            name = category_map.get(name.lower(), name) or DEFAULT_CATEGORY
+            category = categories.get(name.lower())
+            if category is None:
+                category = categories[name.lower()] = name
+                new_categories.append((username, name))
+            batch.append(db.expense_params(username, amount, category, expense_date, description))
+            if len(batch) >= chunk_size:
+                flush()
+        flush()
+    except Exception:
+        conn.rollback()
+        raise
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+# Import a text or binary file object; format is 'csv', 'ofx' or 'qfx'
+def import_file(conn, username, stream, file_format='csv', **kwargs):
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    return import_expenses(conn, username, PARSERS[file_format](text), **kwargs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import expenses from CSV or OFX/QFX files.")
+    parser.add_argument('path', help="file to import")
+    parser.add_argument('--user', required=True, help="username to import for")
+    parser.add_argument('--format', choices=sorted(PARSERS), help="file format (default: from extension)")
+    parser.add_argument('--map', action='append', default=[], metavar='FROM=TO',
+                        help="map a source category to one of yours; repeatable")
+    parser.add_argument('--debits-only', action='store_true',
+                        help="import only negative amounts, as spending (typical bank exports)")
+    parser.add_argument('--decimal', choices=DECIMAL_SEPARATORS, default='.',
+                        help="decimal separator in amounts (default: .)")
+    parser.add_argument('--date-order', choices=DATE_ORDERS, default='auto',
+                        help="day/month order of dates such as 03/04/2024 (default: reject them as ambiguous)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    file_format = args.format or args.path.rsplit('.', 1)[-1].lower()
+    if file_format not in PARSERS:
+        parser.error(f"can't tell the format of {args.path}; pass --format")
+    category_map = dict(item.split('=', 1) for item in args.map)
+
+    db.init_db()
+    with db.connection() as conn:
+        if not conn.execute("SELECT 1 FROM users WHERE username = ?", (args.user,)).fetchone():
+            parser.error(f"unknown user {args.user!r}")
+        with open(args.path, encoding='utf-8-sig', errors='replace', newline='') as stream:
+            stats = import_file(conn, args.user, stream, file_format, category_map=category_map,
+                                debits_only=args.debits_only, decimal=args.decimal, date_order=args.date_order,
+                                chunk_size=args.chunk_size,
+                                on_progress=lambda s: print(f"\r{s.rows_imported:,} rows "
+                                                            f"({s.rows_per_second:,.0f} rows/s)",
+                                                            end='', file=sys.stderr))
+    print(file=sys.stderr)
+    print(stats.summary())
+    for error in stats.errors:
+        print("  " + error)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+# Opt-in: set EXPENSE_TRACKER_PROFILE=1 before starting the app
+ENABLED = os.environ.get('EXPENSE_TRACKER_PROFILE', '') not in ('', '0')
+LOG_PATH = os.environ.get('EXPENSE_TRACKER_PROFILE_LOG', './data/profile.jsonl')
+RECENT_SIZE = 20000           # records kept in memory for the debug panel
+PROGRESS_INTERVAL = 1000      # SQLite VM instructions between progress callbacks
+SQL_NAME_LENGTH = 160
+
+_local = threading.local()
+_recent = deque(maxlen=RECENT_SIZE)
+_log_lock = threading.Lock()
+_log_file = None
+
+# Records made on this thread since the last start_run(); Streamlit runs each
+# script rerun on a single thread, so this is "everything the current page did"
+def start_run():
+    _local.records = []
+
+def current_run():
+    return getattr(_local, 'records', [])
+
+def record(kind, name, seconds, rows=None, steps=None):
+    global _log_file
+    entry = {'ts': round(time.time(), 3), 'kind': kind, 'name': name, 'ms': round(seconds * 1000, 3)}
+    if rows is not None:
+        entry['rows'] = rows
+    if steps is not None:
+        entry['steps'] = steps
+    current_run().append(entry)
+    _recent.append(entry)
+    with _log_lock:
+        if _log_file is None:
+            _log_file = open(LOG_PATH, 'a', buffering=1)
+        _log_file.write(json.dumps(entry) + '\n')
+
+@contextmanager
+def _timer(kind, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - started)
+
+# Time a block, e.g. `with instrumentation.timer('page', 'Dashboard'):`; free when disabled
+def timer(kind, name):
+    return _timer(kind, name) if ENABLED else nullcontext()
+
+# Cursor that records each statement's text, execute-plus-fetch time, rows
+# returned (or changed, for writes) and SQLite VM steps, counted through the
+# connection's progress handler. A statement is recorded once its results are
+# exhausted, or when the cursor is reused, closed or garbage collected.
+class TracedCursor(sqlite3.Cursor):
+    _sql = None
+
+    def _start(self, sql):
+        self._finish()
+        self._sql = sql
+        self._rows = 0
+        self._elapsed = 0.0
+        self._steps = self.connection.vm_steps
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        rows = self._rows if self.description is not None else max(self.rowcount, 0)
+        record('sql', ' '.join(self._sql.split())[:SQL_NAME_LENGTH], self._elapsed, rows,
+               (self.connection.vm_steps - self._steps) * PROGRESS_INTERVAL)
+        self._sql = None
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        self._start(sql)
+        result = self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql)
+        result = self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._sql is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._sql is not None:
+            self._rows += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._sql is not None:
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._sql is not None:
+            self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class TracedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vm_steps = 0
+        self.set_progress_handler(self._count_steps, PROGRESS_INTERVAL)
+
+    def _count_steps(self):
+        self.vm_steps += 1
+        return 0
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# Connection class for db.connect(): traced when profiling is on
+def connection_factory():
+    return TracedConnection if ENABLED else sqlite3.Connection
+
+# Value at percentile p (0-100) of already sorted values, at the nearest index
+def percentile(values, p):
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+# Count, total and p50/p95/p99 milliseconds per (kind, name), slowest total first
+def aggregate(records):
+    groups = defaultdict(list)
+    for entry in records:
+        groups[(entry['kind'], entry['name'])].append(entry['ms'])
+    summary = []
+    for (kind, name), values in groups.items():
+        values.sort()
+        summary.append({
+            'kind': kind,
+            'name': name,
+            'count': len(values),
+            'total_ms': round(sum(values), 3),
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+        })
+    summary.sort(key=lambda row: row['total_ms'], reverse=True)
+    return summary
+
+def recent():
+    return list(_recent)
+
+def read_log(path=LOG_PATH):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# Sidebar panel with this rerun's timings and percentiles over recent runs
+def render_debug_panel(st):
+    with st.sidebar.expander("⏱️ Debug: timings", expanded=False):
+        run = current_run()
+        totals = defaultdict(float)
+        for entry in run:
+            totals[entry['kind']] += entry['ms']
+        st.caption(" · ".join(f"{kind}: {ms:.1f} ms" for kind, ms in sorted(totals.items())) or "Nothing recorded yet")
+        st.dataframe(sorted(run, key=lambda entry: entry['ms'], reverse=True), hide_index=True)
+        st.caption(f"Percentiles over the last {len(_recent)} records (log: {LOG_PATH})")
+        st.dataframe(aggregate(recent()), hide_index=True)
+
+# Summarise a JSON-lines log: python instrumentation.py [path]
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else LOG_PATH
+    print(f"{'kind':6s} {'count':>7s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s} {'total ms':>12s}  name")
+    for row in aggregate(read_log(path)):
+        print(f"{row['kind']:6s} {row['count']:7d} {row['p50_ms']:10.3f} {row['p95_ms']:10.3f} "
+              f"{row['p99_ms']:10.3f} {row['total_ms']:12.1f}  {row['name']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
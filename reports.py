@@ -0,0 +1,150 @@
+import calendar
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+import cache
+import db
+import export
+
+REPORT_WORKERS = 2
+REPORT_CACHE_BYTES = 256 * 1024 * 1024
+ROWS_PER_TABLE = 500          # rows per Table flowable; each splits across pages on its own
+ROW_HEIGHT = 14
+DESCRIPTION_WIDTH = 60        # characters kept from each description
+COLUMN_WIDTHS = [0.95 * inch, 1.35 * inch, 0.95 * inch, 3.75 * inch]
+
+TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f2f6')]),
+    ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+])
+
+# Date span covered by a report. goal_months is the (first, last) month whose
+# goals apply, or None when the span doesn't line up with whole months.
+class ReportPeriod:
+    def __init__(self, start, end, label, goal_months=None):
+        self.start = start
+        self.end = end
+        self.label = label
+        self.goal_months = goal_months
+
+    @classmethod
+    def month(cls, year, month):
+        first = date(year, month, 1)
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        return cls(first, last, f"Monthly Report: {month}/{year}", (first, first))
+
+    @classmethod
+    def year(cls, year):
+        return cls(date(year, 1, 1), date(year, 12, 31), f"Yearly Report: {year}",
+                   (date(year, 1, 1), date(year, 12, 1)))
+
+    @classmethod
+    def between(cls, start, end):
+        return cls(start, end, f"Report: {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+
+    @property
+    def filename(self):
+        return f"report_{self.start:%Y%m%d}_{self.end:%Y%m%d}.pdf"
+
+def spending_status(total, goal):
+    if goal <= 0:
+        return "no goal set"
+    if total > goal:
+        return "overspent"
+    if total > goal * 0.8:
+        return "nearing limit"
+    return "within budget"
+
+# Expense rows as a run of Table flowables; batches are lists of
+# (date, category, amount, description) tuples straight from fetchmany
+def _expense_tables(batches):
+    header = ['Date', 'Category', 'Amount', 'Description']
+    rows = []
+    for batch in batches:
+        for expense_date, category, amount, description in batch:
+            description = description or ''
+            if len(description) > DESCRIPTION_WIDTH:
+                description = description[:DESCRIPTION_WIDTH - 1] + '…'
+            rows.append((expense_date, category, f"${amount:,.2f}", description))
+            if len(rows) == ROWS_PER_TABLE:
+                yield Table([header] + rows, colWidths=COLUMN_WIDTHS, rowHeights=ROW_HEIGHT,
+                            repeatRows=1, style=TABLE_STYLE)
+                rows = []
+    if rows:
+        yield Table([header] + rows, colWidths=COLUMN_WIDTHS, rowHeights=ROW_HEIGHT,
+                    repeatRows=1, style=TABLE_STYLE)
+
+# Render the PDF for one user and period
+def build_report(conn, username, period):
+    styles = getSampleStyleSheet()
+    category_rows = db.category_totals(conn, username, period.start, period.end)
+    total = sum(amount for _, amount in category_rows)
+    goal = db.goal_total(conn, username, *period.goal_months) if period.goal_months else 0.0
+
+    story = [
+        Paragraph(period.label, styles['Title']),
+        Paragraph(f"Total Spending: ${total:,.2f}", styles['Normal']),
+        Paragraph(f"Goal: ${goal:,.2f}", styles['Normal']),
+        Paragraph(f"Spending Status: {spending_status(total, goal).capitalize()}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+    if category_rows:
+        story.append(Paragraph("Spending by Category", styles['Heading2']))
+        story.append(Table([['Category', 'Amount']] + [[category, f"${amount:,.2f}"] for category, amount in category_rows],
+                           colWidths=[2.5 * inch, 1.2 * inch], style=TABLE_STYLE, hAlign='LEFT'))
+        story.append(Spacer(1, 12))
+        story.append(Paragraph("Expenses", styles['Heading2']))
+        story.extend(_expense_tables(export.iter_expense_batches(conn, username, period.start, period.end)))
+    else:
+        story.append(Paragraph("No expenses recorded for this period.", styles['Normal']))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter, title=period.label,
+                      leftMargin=0.75 * inch, rightMargin=0.75 * inch).build(story)
+    return buffer.getvalue()
+
+# Finished PDFs keyed by (user, start, end, data version), and reports in progress
+_finished = cache.LRUCache(REPORT_CACHE_BYTES, weigh=len)
+_pending = {}
+_pending_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report')
+
+def _build_and_cache(key, username, period):
+    try:
+        with db.connection() as conn:
+            pdf = build_report(conn, username, period)
+        _finished.put(key, pdf)
+        return pdf
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+# Start building a report in the background and return a Future for the PDF
+# bytes. A report already built for the same data comes back completed, and a
+# request for one that is still being built shares the running job.
+def submit_report(username, period, version):
+    key = (username, period.start, period.end, period.label, version)
+    pdf = _finished.get(key)
+    if pdf is not None:
+        future = Future()
+        future.set_result(pdf)
+        return future
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = _executor.submit(_build_and_cache, key, username, period)
+    return future
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+import pytest
+
+import db
+
+# A fresh database under tmp_path, made the process default for the test
+@pytest.fixture
+def database(tmp_path):
+    previous = db.DB_PATH
+    path = str(tmp_path / 'expense_tracker.db')
+    db.use_database(path)
+    db.init_db()
+    db.add_user('alice', 'secret', 'Alice', 'alice@example.com')
+    db.add_user('bob', 'secret', 'Bob', 'bob@example.com')
+    yield path
+    db.use_database(previous)
+
+@pytest.fixture
+def conn(database):
+    with db.connection() as conn:
+        yield conn
+
+# Insert (amount, category, date, description) rows for a user and commit
+def add_expenses(conn, username, rows):
+    conn.executemany(db.INSERT_EXPENSE, [db.expense_params(username, *row) for row in rows])
+    conn.commit()
+
+# One expense every `step` days over [start, end), cycling through the
+# default categories
+def daily_expenses(start, end, step=1):
+    categories = ['Food', 'Transport', 'Rent', 'Others']
+    rows, day, index = [], start, 0
+    while day < end:
+        rows.append((1 + index % 50, categories[index % len(categories)], day, f"item {index}"))
+        day += timedelta(days=step)
+        index += 1
+    return rows
+
+HISTORY_START = date(2022, 1, 1)
+HISTORY_END = date(2024, 7, 1)
@@ -0,0 +1,83 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+import analytics
+import db
+from conftest import HISTORY_END, HISTORY_START, add_expenses, daily_expenses
+
+@pytest.fixture
+def history(conn):
+    add_expenses(conn, 'alice', daily_expenses(HISTORY_START, HISTORY_END))
+    return analytics.load_history(conn, 'alice')
+
+def month_number(day):
+    return (day.year - 1970) * 12 + day.month - 1
+
+@pytest.mark.parametrize('start, end', [(date(2022, 3, 15), date(2023, 8, 20)), (date(2023, 2, 1), date(2023, 2, 28)),
+                                        (date(2024, 6, 3), date(2024, 6, 9)), (HISTORY_START, HISTORY_END)])
+def test_category_totals_match_the_database(conn, history, start, end):
+    totals = history.category_totals(*db.day_numbers(start, end))
+    expected = dict(db.category_totals(conn, 'alice', start, end))
+    assert {name: cents / 100 for name, cents in zip(history.categories, totals) if cents} == pytest.approx(expected)
+
+def test_monthly_matches_the_database(conn, history):
+    months, cents = history.monthly(month_number(HISTORY_START), month_number(HISTORY_END))
+    expected = db.monthly_totals(conn, 'alice', HISTORY_START, date(2024, 6, 30))
+    assert [str(month) for month in analytics.as_months(months)] == [month for month, _ in expected]
+    assert list(cents / 100) == pytest.approx([total for _, total in expected])
+
+def test_daily_covers_the_whole_range(history):
+    days, cents = history.daily(*db.day_numbers(date(2021, 12, 30), date(2022, 1, 2)))
+    assert [str(day) for day in analytics.as_dates(days)] == ['2021-12-30', '2021-12-31', '2022-01-01', '2022-01-02']
+    assert list(cents) == [0, 0, 100, 200]
+
+# Sunday 3 March 2024 ends one week and Monday 4 March starts the next
+def test_weeks_start_on_monday(conn):
+    add_expenses(conn, 'alice', [(1, 'Food', date(2024, 2, 28), "wed"), (2, 'Food', date(2024, 3, 3), "sun"),
+                                 (4, 'Food', date(2024, 3, 4), "mon"), (8, 'Food', date(2024, 3, 10), "sun"),
+                                 (16, 'Food', date(2024, 3, 11), "next mon")])
+    history = analytics.load_history(conn, 'alice')
+    weeks, cents = history.weekly(*db.day_numbers(date(2024, 2, 28), date(2024, 3, 10)))
+    assert [str(week) for week in analytics.as_dates(weeks)] == ['2024-02-26', '2024-03-04']
+    assert list(cents) == [300, 1200]
+
+def test_months_split_at_the_first(conn):
+    add_expenses(conn, 'alice', [(1, 'Food', date(2024, 1, 31), "last"), (2, 'Food', date(2024, 2, 1), "first"),
+                                 (4, 'Food', date(2024, 2, 29), "leap"), (8, 'Food', date(2024, 3, 1), "march")])
+    history = analytics.load_history(conn, 'alice')
+    months, cents = history.monthly(month_number(date(2024, 1, 1)), month_number(date(2024, 4, 1)))
+    assert [str(month) for month in analytics.as_months(months)] == ['2024-01', '2024-02', '2024-03']
+    assert list(cents) == [100, 600, 800]
+
+def test_empty_history(conn):
+    history = analytics.load_history(conn, 'bob')
+    start, end = db.day_numbers(date(2024, 1, 1), date(2024, 1, 31))
+    assert history.empty
+    assert list(history.daily(start, end)[1]) == [0] * 31
+    assert list(history.weekly(start, end)[1]) == [0] * 5
+    assert list(history.monthly(month_number(date(2024, 1, 1)), month_number(date(2024, 3, 1)))[1]) == [0, 0]
+    assert list(history.category_totals(start, end)) == [0] * len(history.categories)
+    assert history.extremes(start, end) == (None, None)
+    assert [len(array) for array in history.goal_attainment()] == [0, 0, 0]
+
+def test_rolling_mean():
+    assert list(analytics.rolling_mean(np.array([1, 2, 3, 4, 5]), 2)) == [1, 1.5, 2.5, 3.5, 4.5]
+    assert list(analytics.rolling_mean(np.array([3, 6, 9]), 7)) == [3, 4.5, 6]
+    assert len(analytics.rolling_mean(np.array([]), 3)) == 0
+
+def test_change():
+    difference, fraction = analytics.change([100, 150, 0, 50], 1)
+    np.testing.assert_array_equal(difference, [np.nan, 50, -150, 50])
+    np.testing.assert_array_equal(fraction, [np.nan, 0.5, -1, np.nan])
+    difference, fraction = analytics.change([100, 150], 12)
+    assert np.isnan(difference).all() and np.isnan(fraction).all()
+
+def test_resample():
+    x, y = np.arange(10), np.arange(10.0)
+    assert analytics.resample(x, y, max_points=10) == (x, y)
+    x_buckets, y_means, y_doubled = analytics.resample(x, y, y * 2, max_points=4)
+    assert list(x_buckets) == [0, 3, 6, 9]
+    assert list(y_means) == [1, 4, 7, 9]
+    assert list(y_doubled) == [2, 8, 14, 18]
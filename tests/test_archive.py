@@ -0,0 +1,122 @@
+from datetime import date
+
+import pytest
+
+import archive
+import db
+from conftest import HISTORY_END, HISTORY_START, add_expenses, daily_expenses
+
+TODAY = date(2024, 6, 30)
+
+def quiet(message):
+    pass
+
+def snapshot(conn):
+    return {
+        'history': sorted(conn.execute("SELECT id, user_id, category_id, day, cents, description "
+                                       "FROM expense_history").fetchall()),
+        'totals': sorted((username, month, category, round(total, 2), count) for username, month, category, total, count
+                         in conn.execute("SELECT username, month, category, total, count FROM monthly_category_totals")),
+    }
+
+@pytest.fixture
+def history(database):
+    with db.connection() as conn:
+        add_expenses(conn, 'alice', daily_expenses(HISTORY_START, HISTORY_END))
+        add_expenses(conn, 'bob', daily_expenses(HISTORY_START, HISTORY_END, step=4))
+        return snapshot(conn)
+
+def test_closed_months_move_and_reads_stay_the_same(database, history):
+    summary = archive.run(database, today=TODAY, log=quiet)
+    assert summary['months'] == 18
+    with db.connection() as conn:
+        first_live = conn.execute("SELECT MIN(day) FROM main.expense_rows").fetchone()[0]
+        assert first_live == db.to_day(date(2023, 7, 1))
+        assert summary['archived_rows'] == conn.execute("SELECT COUNT(*) FROM archive.expense_rows").fetchone()[0]
+        assert snapshot(conn) == history
+        assert conn.execute("SELECT COUNT(*) FROM archive.archive_batches WHERE done = 0").fetchone()[0] == 0
+    assert archive.run(database, today=TODAY, log=quiet)['months'] == 0
+
+def test_an_interrupted_run_is_finished_by_the_next(database, history, monkeypatch):
+    finish = archive._finish_batch
+    calls = []
+
+    def crash_on_third(conn, batch):
+        calls.append(batch)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return finish(conn, batch)
+
+    monkeypatch.setattr(archive, '_finish_batch', crash_on_third)
+    with pytest.raises(KeyboardInterrupt):
+        archive.run(database, today=TODAY, log=quiet)
+    with db.connection() as conn:
+        # The third month's copy is committed, but not counted by readers yet
+        assert conn.execute("SELECT COUNT(*) FROM archive.archive_batches WHERE done = 0").fetchone()[0] == 1
+        assert snapshot(conn) == history
+    monkeypatch.setattr(archive, '_finish_batch', finish)
+    archive.run(database, today=TODAY, log=quiet)
+    with db.connection() as conn:
+        assert snapshot(conn) == history
+        assert conn.execute("SELECT COUNT(*) FROM archive.expense_rows GROUP BY id HAVING COUNT(*) > 1").fetchall() == []
+
+def test_rows_edited_after_the_copy_stay_live(database, history):
+    conn = db.connect(database)
+    conn.isolation_level = None
+    try:
+        month = archive.closed_months(conn, archive.cutoff(TODAY))[0]
+        start, end = archive._month_days(month)
+        # Copy the month the way archive_month does, without finishing it
+        conn.execute("INSERT INTO archive.archive_batches (batch, month) VALUES (1, ?)", (month,))
+        conn.execute("INSERT INTO archive.expense_rows (id, user_id, category_id, day, cents, description, batch) "
+                     "SELECT id, user_id, category_id, day, cents, description, 1 FROM main.expense_rows "
+                     "WHERE day >= ? AND day < ?", (start, end))
+        edited, deleted = conn.execute("SELECT id FROM main.expense_rows WHERE day >= ? AND day < ? ORDER BY id "
+                                       "LIMIT 2", (start, end)).fetchall()
+        conn.execute("UPDATE main.expense_rows SET cents = cents + 1000 WHERE id = ?", edited)
+        conn.execute("DELETE FROM main.expense_rows WHERE id = ?", deleted)
+        expected = snapshot(conn)
+        assert archive.reconcile(conn) == 1
+        assert snapshot(conn) == expected
+        assert conn.execute("SELECT cents FROM main.expense_rows WHERE id = ?", edited).fetchone() is not None
+        assert conn.execute("SELECT 1 FROM archive.expense_rows WHERE id IN (?, ?)",
+                            (edited[0], deleted[0])).fetchall() == []
+    finally:
+        conn.close()
+
+# A crash between the two files' commits leaves the batch listed in the main
+# database but not marked done in the archive; reconciling redoes the archive
+# side only
+def test_reconcile_is_idempotent_after_the_main_commit(database, history):
+    archive.run(database, today=TODAY, log=quiet)
+    conn = db.connect(database)
+    conn.isolation_level = None
+    try:
+        conn.execute("UPDATE archive.archive_batches SET done = 0 WHERE batch IN (2, 5)")
+        conn.execute("DELETE FROM archive.monthly_category_totals WHERE batch = 2")
+        totals = conn.execute("SELECT * FROM archive.monthly_category_totals WHERE batch = 5 ORDER BY 2, 3, 4").fetchall()
+        assert archive.reconcile(conn) == 2
+        assert conn.execute("SELECT * FROM archive.monthly_category_totals WHERE batch = 5 "
+                            "ORDER BY 2, 3, 4").fetchall() == totals
+        assert conn.execute("SELECT COUNT(*) FROM archive.monthly_category_totals WHERE batch = 2").fetchone()[0] > 0
+        assert snapshot(conn) == history
+    finally:
+        conn.close()
+
+def test_the_current_month_is_never_archived(database):
+    with pytest.raises(ValueError):
+        archive.run(database, keep_months=0, log=quiet)
+    assert archive.cutoff(date(2024, 1, 15), keep_months=1) == date(2024, 1, 1)
+    assert archive.cutoff(date(2024, 1, 15), keep_months=13) == date(2023, 1, 1)
+
+def test_month_lookups_search_the_day_index(database, history):
+    with db.connection() as conn:
+        statements = []
+        conn.set_trace_callback(statements.append)
+        archive.closed_months(conn, archive.cutoff(TODAY))
+        conn.set_trace_callback(None)
+        start, end = archive._month_days('2022-03')
+        statements.append(f"SELECT id FROM main.expense_rows WHERE day >= {start} AND day < {end}")
+        for sql in statements:
+            details = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            assert any('INDEX idx_expense_rows_day' in detail for detail in details), (sql, details)
@@ -0,0 +1,61 @@
+from datetime import date
+
+import pytest
+
+import archive
+import db
+from conftest import HISTORY_END, HISTORY_START, add_expenses, daily_expenses
+
+# Every page of browse_expenses, following the keyset the Browse page keeps
+def all_pages(conn, page_size, **filters):
+    pages, after = [], None
+    while True:
+        rows = db.browse_expenses(conn, 'alice', after=after, limit=page_size + 1, **filters)
+        pages.append(rows[:page_size])
+        if len(rows) <= page_size:
+            return pages
+        after = (rows[page_size - 1][1], rows[page_size - 1][0])
+
+def expected(conn, where="1", params=()):
+    return conn.execute(f"SELECT id, date, category, amount, description FROM expenses WHERE username = 'alice' "
+                        f"AND {where} ORDER BY date DESC, id DESC", params).fetchall()
+
+@pytest.fixture
+def history(conn):
+    # Three expenses a day, so pages split days with several rows
+    for _ in range(3):
+        add_expenses(conn, 'alice', daily_expenses(HISTORY_START, date(2022, 4, 1)))
+    add_expenses(conn, 'bob', daily_expenses(HISTORY_START, date(2022, 4, 1)))
+    return conn
+
+def test_pages_cover_the_history_once_newest_first(history):
+    pages = all_pages(history, 7)
+    assert all(len(page) == 7 for page in pages[:-1])
+    assert [row for page in pages for row in page] == expected(history)
+
+def test_filters_apply_before_paging(history):
+    pages = all_pages(history, 10, start_date=date(2022, 2, 1), end_date=date(2022, 2, 28), categories=('Food', 'Rent'),
+                      min_amount=5, max_amount=30)
+    assert [row for page in pages for row in page] == expected(
+        history, "date BETWEEN '2022-02-01' AND '2022-02-28' AND category IN ('Food', 'Rent') "
+                 "AND amount BETWEEN 5 AND 30")
+
+def test_text_matches_word_prefixes(history):
+    add_expenses(history, 'alice', [(3, 'Food', date(2022, 3, 3), "Coffee at the station"),
+                                    (4, 'Food', date(2022, 3, 4), "decaf coffee"),
+                                    (5, 'Food', date(2022, 3, 5), "toffee")])
+    add_expenses(history, 'bob', [(3, 'Food', date(2022, 3, 3), "coffee")])
+    assert [row[4] for row in db.browse_expenses(history, 'alice', text='cof')] == ["decaf coffee",
+                                                                                   "Coffee at the station"]
+    assert [row[4] for row in db.browse_expenses(history, 'alice', text='coffee stat')] == ["Coffee at the station"]
+
+def test_archived_months_page_and_search_like_live_ones(history, database):
+    add_expenses(history, 'alice', daily_expenses(date(2022, 4, 1), HISTORY_END, step=5)
+                 + [(12, 'Food', date(2022, 1, 15), "archived espresso")])
+    before = all_pages(history, 25)
+    archive.run(database, today=date(2024, 6, 30), log=lambda message: None)
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM main.expense_rows WHERE day < ?",
+                            (db.to_day(date(2023, 7, 1)),)).fetchone()[0] == 0
+        assert all_pages(conn, 25) == before
+        assert [row[4] for row in db.browse_expenses(conn, 'alice', text='espr')] == ["archived espresso"]
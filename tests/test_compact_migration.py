@@ -0,0 +1,88 @@
+import pytest
+
+import db
+
+ROWS = [
+    ('alice', 12.5, 'Food', '2023-01-31', "lunch"),
+    ('alice', 0.1 + 0.2, 'Transport', '2023-02-01', "bus"),
+    ('alice', 40.0, 'Gifts', '2023-02-14', "flowers"),   # category never added
+    ('carol', 7.25, 'Food', '2023-03-01', "no account"),  # owner without an account
+    ('alice', 3.0, 'Food', None, "undated"),
+    ('bob', 99.99, 'Rent', '2024-12-31', "december rent"),
+]
+
+# A database at migration 4 holding ROWS in the original text layout
+@pytest.fixture
+def upgraded(tmp_path):
+    previous = db.DB_PATH
+    db.use_database(str(tmp_path / 'old.db'))
+    with db.connection() as conn:
+        db._create_tables(conn)
+        db.migrate_db(conn, target=4)
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, 'x')", [('alice',), ('bob',)])
+        conn.executemany("INSERT INTO categories (username, category) VALUES (?, ?)",
+                         [(username, category) for username in ('alice', 'bob')
+                          for category in ('Food', 'Transport', 'Rent')])
+        conn.executemany("INSERT INTO expenses (username, amount, category, date, description) VALUES (?, ?, ?, ?, ?)",
+                         ROWS)
+        conn.execute("DELETE FROM expenses WHERE description = 'lunch'")
+        conn.execute("INSERT INTO expenses (username, amount, category, date, description) "
+                     "VALUES ('alice', 12.5, 'Food', '2023-01-31', 'lunch')")
+        conn.commit()
+        before = {
+            'expenses': conn.execute("SELECT id, username, amount, category, date, description FROM expenses "
+                                     "ORDER BY id").fetchall(),
+            'totals': conn.execute("SELECT username, month, category, round(total, 2), count "
+                                   "FROM monthly_category_totals ORDER BY 1, 2, 3").fetchall(),
+            'versions': dict(conn.execute("SELECT username, version FROM data_versions")),
+        }
+        db.migrate_db(conn)
+        db.attach_archive(conn)
+        yield conn, before
+    db.use_database(previous)
+
+def test_rows_read_back_the_same_through_the_view(upgraded):
+    conn, before = upgraded
+    after = conn.execute("SELECT id, username, amount, category, date, description FROM expenses "
+                         "ORDER BY id").fetchall()
+    assert [row[:2] + (round(row[2], 2),) + row[3:] for row in before['expenses']] == after
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'expenses'").fetchone()[0] == 'view'
+
+def test_missing_users_and_categories_get_ids(upgraded):
+    conn, _ = upgraded
+    assert conn.execute("SELECT COUNT(*) FROM expense_rows WHERE user_id IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM expense_rows WHERE category_id IS NULL").fetchone()[0] == 0
+    assert 'Gifts' in db.get_categories(conn, 'alice')
+    assert db.user_id(conn, 'carol') is not None
+    assert not db.authenticate('carol', '')
+
+def test_summary_totals_and_ids_carry_on(upgraded):
+    conn, before = upgraded
+    assert conn.execute("SELECT username, month, category, round(total, 2), count FROM monthly_category_totals "
+                        "ORDER BY 1, 2, 3").fetchall() == before['totals']
+    last_id = before['expenses'][-1][0]
+    conn.execute(db.INSERT_EXPENSE, db.expense_params('alice', 2.5, 'Food', '2023-01-15', "new lunch"))
+    conn.commit()
+    assert conn.execute("SELECT MAX(id) FROM expense_rows").fetchone()[0] == last_id + 1
+    assert db.month_total(conn, 'alice', 2023, 1) == pytest.approx(15.0)
+    assert db.data_version(conn, 'alice') > before['versions']['alice']
+
+def test_writes_through_the_view_keep_working(upgraded):
+    conn, _ = upgraded
+    conn.execute("INSERT INTO expenses (username, amount, category, date, description) "
+                 "VALUES ('bob', 5.555, 'Books', '2024-01-02', 'novel')")
+    conn.execute("UPDATE expenses SET amount = 20, date = '2024-02-02' WHERE description = 'novel'")
+    conn.execute("DELETE FROM expenses WHERE description = 'bus'")
+    conn.commit()
+    assert conn.execute("SELECT amount, category, date FROM expenses WHERE description = 'novel'").fetchone() == \
+        (20.0, 'Books', '2024-02-02')
+    assert db.month_category_totals(conn, 'bob', 2024, 2) == [('Books', 20.0)]
+    assert db.month_category_totals(conn, 'alice', 2023, 2) == [('Gifts', 40.0)]
+
+def test_search_index_still_points_at_the_rows(upgraded):
+    conn, _ = upgraded
+    if not db.has_search_index(conn):
+        pytest.skip("SQLite built without FTS5")
+    assert [row[4] for row in db.browse_expenses(conn, 'bob', text='dec')] == ["december rent"]
+    conn.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('integrity-check')")
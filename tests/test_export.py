@@ -0,0 +1,21 @@
+import csv
+import gzip
+import io
+from datetime import date
+
+import export
+from conftest import add_expenses, daily_expenses
+
+def test_download_is_bytes_in_date_order(conn):
+    rows = daily_expenses(date(2024, 1, 1), date(2024, 3, 1))
+    add_expenses(conn, 'alice', rows[::-1])
+    add_expenses(conn, 'bob', rows[:5])
+    data = export.export_file('alice', date(2024, 2, 1), date(2024, 2, 29))
+    assert isinstance(data, bytes)
+    exported = list(csv.reader(io.StringIO(data.decode('utf-8'))))
+    assert exported[0] == export.EXPORT_COLUMNS
+    assert [line[0] for line in exported[1:]] == [day.isoformat() for _, _, day, _ in rows if day.month == 2]
+
+def test_gzip_download_matches_csv(conn):
+    add_expenses(conn, 'alice', daily_expenses(date(2023, 1, 1), date(2024, 1, 1)))
+    assert gzip.decompress(export.export_file('alice', file_format='csv.gz')) == export.export_file('alice')
@@ -0,0 +1,102 @@
+import io
+
+import pytest
+
+import db
+import importer
+
+def import_csv(conn, text, **kwargs):
+    return importer.import_file(conn, 'alice', io.StringIO(text), 'csv', **kwargs)
+
+def imported(conn):
+    return conn.execute("SELECT date, amount, category, description FROM expenses WHERE username = 'alice' "
+                        "ORDER BY id").fetchall()
+
+@pytest.mark.parametrize('text, decimal, amount', [
+    ("12.50", '.', 12.5),
+    ("-1,234.50", '.', -1234.5),
+    ("(12.00)", '.', -12.0),
+    ("$5", '.', 5.0),
+    ("1'234.5", '.', 1234.5),
+    ("12,50", ',', 12.5),
+    ("1.234,56", ',', 1234.56),
+    ("1 234,56", ',', 1234.56),
+    ("1.234,50 EUR", ',', 1234.5),
+    ("-€3", ',', -3.0),
+])
+def test_amounts(text, decimal, amount):
+    assert importer._parse_amount(text, decimal) == amount
+
+@pytest.mark.parametrize('text, decimal', [
+    ("12,50", '.'),
+    ("1.234,56", '.'),
+    ("1 234,56", '.'),
+    ("1,234.56", ','),
+    ("12abc34", '.'),
+    ("1,23,456", '.'),
+    ("(5", '.'),
+    ("", '.'),
+])
+def test_unclear_amounts_are_rejected(text, decimal):
+    with pytest.raises(ValueError):
+        importer._parse_amount(text, decimal)
+
+def test_decimal_commas_are_rejected_unless_chosen(conn):
+    text = 'date,amount,category,description\n2024-01-09,"12,50",Food,lunch\n2024-01-10,"1.234,56",Rent,rent\n'
+    stats = import_csv(conn, text)
+    assert (stats.rows_imported, stats.rows_skipped) == (0, 2)
+    assert stats.errors[0] == "row 2: unrecognised amount '12,50'"
+    stats = import_csv(conn, text, decimal=',')
+    assert stats.rows_imported == 2
+    assert imported(conn) == [('2024-01-09', 12.5, 'Food', 'lunch'), ('2024-01-10', 1234.56, 'Rent', 'rent')]
+
+def test_ofx_entities_are_decoded(conn):
+    ofx = ("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+           "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240109120000<TRNAMT>-23.40<NAME>Grocer &amp; Co</STMTTRN>\n"
+           "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240110<TRNAMT>-5.00<MEMO>Caf&#233; &lt;Main St&gt;</STMTTRN>\n"
+           "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    stats = importer.import_file(conn, 'alice', io.StringIO(ofx), 'ofx', debits_only=True)
+    assert stats.rows_imported == 2
+    assert imported(conn) == [('2024-01-09', 23.4, 'Others', 'Grocer & Co'),
+                              ('2024-01-10', 5.0, 'Others', 'Café <Main St>')]
+
+def test_rows_without_a_description_are_rejected(conn):
+    stats = import_csv(conn, "date,amount,description\n2024-01-09,5\n2024-01-10,6,  \n2024-01-11,7,bus\n")
+    assert (stats.rows_imported, stats.rows_skipped) == (1, 2)
+    assert stats.errors == ["row 2: missing description", "row 3: missing description"]
+    assert imported(conn) == [('2024-01-11', 7.0, 'Others', 'bus')]
+
+@pytest.mark.parametrize('text, date_order, expected', [
+    ("2024-03-04", 'auto', '2024-03-04'),
+    ("04.03.2024", 'auto', '2024-03-04'),
+    ("20240304", 'auto', '2024-03-04'),
+    ("03/13/2024", 'auto', '2024-03-13'),
+    ("13/03/2024", 'auto', '2024-03-13'),
+    ("03/03/2024", 'auto', '2024-03-03'),
+    ("03/04/2024", 'mdy', '2024-03-04'),
+    ("03/04/2024", 'dmy', '2024-04-03'),
+])
+def test_dates(text, date_order, expected):
+    assert importer._parse_date(text, date_order) == expected
+
+@pytest.mark.parametrize('text, date_order, error', [
+    ("03/04/2024", 'auto', "ambiguous date '03/04/2024'"),
+    ("13/03/2024", 'mdy', "unrecognised date '13/03/2024'"),
+    ("03/13/2024", 'dmy', "unrecognised date '03/13/2024'"),
+    ("next tuesday", 'auto', "unrecognised date 'next tuesday'"),
+])
+def test_unclear_dates_are_rejected(text, date_order, error):
+    with pytest.raises(ValueError, match=error):
+        importer._parse_date(text, date_order)
+
+def test_ambiguous_dates_need_a_date_order(conn):
+    text = "date,amount,description\n03/04/2024,5,lunch\n"
+    stats = import_csv(conn, text)
+    assert stats.rows_imported == 0
+    assert stats.errors[0].startswith("row 2: ambiguous date '03/04/2024'")
+    import_csv(conn, text, date_order='dmy')
+    assert imported(conn) == [('2024-04-03', 5.0, 'Others', 'lunch')]
+
+def test_type_column_is_not_a_category(conn):
+    import_csv(conn, "date,amount,type,description\n2024-01-09,5,DEBIT,lunch\n")
+    assert imported(conn) == [('2024-01-09', 5.0, 'Others', 'lunch')]
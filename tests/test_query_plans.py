@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+import archive
+import db
+import export
+from conftest import HISTORY_END, HISTORY_START, add_expenses, daily_expenses
+
+EXPENSE_TABLES = ('expense_rows', 'expense_history', 'monthly_category_totals')
+
+@pytest.fixture(params=['live', 'archived'])
+def history(request, database):
+    with db.connection() as conn:
+        add_expenses(conn, 'alice', daily_expenses(HISTORY_START, HISTORY_END))
+        add_expenses(conn, 'bob', daily_expenses(HISTORY_START, HISTORY_END, step=3))
+    if request.param == 'archived':
+        archive.run(database, today=date(2024, 6, 30), log=lambda message: None)
+    with db.connection() as conn:
+        yield conn
+
+# EXPLAIN QUERY PLAN details of every expense query `call` runs, keyed by SQL
+def plans(conn, call):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return {sql: [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            for sql in statements if sql.startswith('SELECT') and 'sqlite_master' not in sql
+            and any(table in sql for table in EXPENSE_TABLES)}
+
+# Every expense table is reached through an index, and only the operations
+# in `sorts` (e.g. 'GROUP BY') may use a temporary B-tree. The only scans
+# allowed are of full-text indexes and of subqueries run as co-routines.
+def assert_indexed(found, sorts=()):
+    assert found
+    for sql, details in found.items():
+        subqueries = sum(detail.startswith(('CO-ROUTINE', 'MATERIALIZE')) for detail in details)
+        scans = [detail for detail in details if detail.startswith('SCAN') and 'VIRTUAL TABLE' not in detail]
+        assert len(scans) <= subqueries, (sql, details)
+        for detail in details:
+            if 'TEMP B-TREE' in detail:
+                assert any(detail.endswith('FOR ' + sort) for sort in sorts), (sql, details)
+        assert any(detail.startswith('SEARCH') and ('INDEX' in detail or 'PRIMARY KEY' in detail)
+                   for detail in details), (sql, details)
+
+def test_month_queries_use_the_summary_key(history):
+    assert_indexed(plans(history, lambda: (db.month_total(history, 'alice', 2024, 5),
+                                           db.month_category_totals(history, 'alice', 2024, 5),
+                                           db.monthly_totals(history, 'alice', date(2022, 3, 1), date(2024, 5, 1)))))
+
+def test_range_queries_search_by_user_and_day(history):
+    def call():
+        db.category_totals(history, 'alice', date(2022, 3, 5), date(2024, 5, 20))
+        db.category_totals(history, 'alice', date(2024, 5, 5), date(2024, 5, 20))
+    found = plans(history, call)
+    assert_indexed(found, sorts=('GROUP BY',))
+    assert all(any('(user_id=? AND day>? AND day<?)' in detail for detail in details) or 'expense_' not in sql
+               for sql, details in found.items())
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'start_date': date(2022, 2, 1), 'end_date': date(2024, 6, 1)},
+    {'categories': ('Food', 'Rent'), 'min_amount': 5, 'max_amount': 40},
+    {'text': 'item'},
+    {'after': ('2023-03-01', 10 ** 9)},
+])
+def test_browse_pages_merge_index_order_without_sorting(history, filters):
+    assert_indexed(plans(history, lambda: db.browse_expenses(history, 'alice', limit=51, **filters)))
+
+def test_export_streams_in_index_order_without_sorting(history):
+    assert_indexed(plans(history, lambda: list(export.iter_expense_batches(history, 'alice'))))
+    assert_indexed(plans(history, lambda: list(export.iter_expense_batches(history, 'alice', date(2022, 6, 1),
+                                                                           date(2023, 6, 30)))))
@@ -0,0 +1,41 @@
+from datetime import date
+
+import db
+from conftest import add_expenses, daily_expenses
+
+# monthly_category_totals recomputed from the expense rows
+def recomputed(conn):
+    return sorted(conn.execute(
+        "SELECT username, strftime('%Y-%m', date), category, round(SUM(amount), 2), COUNT(*) FROM expenses "
+        "GROUP BY 1, 2, 3").fetchall())
+
+def summary(conn):
+    return sorted((username, month, category, round(total, 2), count) for username, month, category, total, count
+                  in conn.execute("SELECT username, month, category, total, count FROM monthly_category_totals"))
+
+def test_inserts_add_to_their_month_and_category(conn):
+    add_expenses(conn, 'alice', [(10.25, 'Food', date(2024, 3, 1), "lunch"), (4.75, 'Food', date(2024, 3, 31), "tea"),
+                                 (30, 'Rent', date(2024, 4, 1), "rent")])
+    assert summary(conn) == [('alice', '2024-03', 'Food', 15.0, 2), ('alice', '2024-04', 'Rent', 30.0, 1)]
+    assert db.month_total(conn, 'alice', 2024, 3) == 15.0
+    assert db.month_category_totals(conn, 'alice', 2024, 4) == [('Rent', 30.0)]
+
+def test_updates_move_amounts_between_months_and_categories(conn):
+    add_expenses(conn, 'alice', daily_expenses(date(2024, 1, 1), date(2024, 4, 1)))
+    conn.execute("UPDATE expense_rows SET cents = cents + 199 WHERE id % 7 = 0")
+    conn.execute("UPDATE expense_rows SET day = day + 20 WHERE id % 5 = 0")
+    conn.execute("UPDATE expense_rows SET category_id = (SELECT id FROM categories WHERE username = 'alice' "
+                 "AND category = 'Others') WHERE id % 3 = 0")
+    conn.execute("UPDATE expenses SET category = 'Education', date = '2024-06-15' WHERE id = 2")
+    conn.commit()
+    assert summary(conn) == recomputed(conn)
+
+def test_deleting_the_last_expense_removes_the_row(conn):
+    add_expenses(conn, 'alice', [(10, 'Food', date(2024, 3, 1), "lunch"), (20, 'Food', date(2024, 3, 2), "dinner")])
+    add_expenses(conn, 'bob', [(5, 'Food', date(2024, 3, 1), "snack")])
+    conn.execute("DELETE FROM expenses WHERE description = 'lunch'")
+    assert summary(conn) == [('alice', '2024-03', 'Food', 20.0, 1), ('bob', '2024-03', 'Food', 5.0, 1)]
+    conn.execute("DELETE FROM expense_rows WHERE description = 'dinner'")
+    conn.commit()
+    assert summary(conn) == [('bob', '2024-03', 'Food', 5.0, 1)]
+    assert db.month_total(conn, 'alice', 2024, 3) == 0
@@ -0,0 +1,38 @@
+from datetime import date
+
+import pytest
+
+import db
+import writer
+
+@pytest.fixture
+def wishlist(conn):
+    conn.executemany("INSERT INTO wishlist (username, item, purchased) VALUES (?, ?, 0)",
+                     [('alice', item) for item in ("coffee machine", "laptop", "Running Shoes", "Headphones")])
+    conn.commit()
+    return conn
+
+@pytest.mark.parametrize('description, item', [
+    ("coffee", "coffee machine"),
+    ("laptop bag", "laptop"),
+    ("run", "Running Shoes"),
+    ("headphone", "Headphones"),
+])
+def test_near_matches_are_only_suggested(wishlist, description, item):
+    assert db.match_wishlist(wishlist, 'alice', description)[1:] == (item, False)
+
+def test_same_name_ignoring_case_is_exact(wishlist):
+    assert db.match_wishlist(wishlist, 'alice', " running shoes ")[1:] == ("Running Shoes", True)
+    assert db.match_wishlist(wishlist, 'alice', "groceries") is None
+    assert db.match_wishlist(wishlist, 'bob', "laptop") is None
+
+def test_purchase_marks_the_matched_row_only(wishlist):
+    wishlist.execute("INSERT INTO wishlist (username, item, purchased) VALUES ('alice', 'laptop', 0)")
+    wishlist.commit()
+    item_id = db.match_wishlist(wishlist, 'alice', "laptop")[0]
+    try:
+        writer.add_expense('alice', 900, 'Others', date(2024, 5, 1), "laptop", item_id).result()
+    finally:
+        writer.close()
+    rows = dict(wishlist.execute("SELECT id, purchased FROM wishlist WHERE item = 'laptop'"))
+    assert len(rows) == 2 and rows.pop(item_id) == 1 and list(rows.values()) == [0]
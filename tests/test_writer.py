@@ -0,0 +1,97 @@
+import sqlite3
+import time
+from datetime import date
+
+import pytest
+
+import db
+import importer
+import writer
+from conftest import daily_expenses
+
+@pytest.fixture
+def group_writer(database):
+    group_writer = writer.GroupCommitWriter(database, max_batch=16, max_wait=0.05, lock_wait=5)
+    yield group_writer
+    group_writer.close()
+
+def insert_expense(description, username='alice', category='Food'):
+    return (db.INSERT_EXPENSE, db.expense_params(username, 5, category, date(2024, 5, 1), description))
+
+def descriptions(conn):
+    return sorted(row[0] for row in conn.execute("SELECT description FROM expense_rows"))
+
+def test_a_failing_write_is_rolled_back_alone(group_writer, conn):
+    futures = [group_writer.submit([insert_expense("first")]),
+               group_writer.submit([("INSERT INTO categories (username, category) VALUES ('alice', 'Food')", ())]),
+               group_writer.submit([insert_expense("second")])]
+    assert isinstance(futures[0].result(), int)
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert isinstance(futures[2].result(), int)
+    assert group_writer.batches == 1
+    assert descriptions(conn) == ["first", "second"]
+
+def test_statements_of_one_write_commit_together(group_writer, conn):
+    future = group_writer.submit([insert_expense("orphan"),
+                                  ("INSERT INTO categories (username, category) VALUES ('alice', 'Food')", ())])
+    with pytest.raises(sqlite3.IntegrityError):
+        future.result()
+    assert descriptions(conn) == []
+
+def test_waits_for_a_lock_held_longer_than_busy_timeout(database, conn, monkeypatch):
+    monkeypatch.setattr(db, 'BUSY_TIMEOUT_MS', 100)
+    group_writer = writer.GroupCommitWriter(database, lock_wait=5)
+    try:
+        holder = sqlite3.connect(database, isolation_level=None)
+        holder.execute("BEGIN IMMEDIATE")
+        future = group_writer.submit([insert_expense("waited")])
+        time.sleep(0.5)
+        assert not future.done()
+        holder.execute("COMMIT")
+        assert isinstance(future.result(timeout=5), int)
+    finally:
+        group_writer.close()
+    assert descriptions(conn) == ["waited"]
+
+def test_gives_up_after_lock_wait(database, monkeypatch):
+    monkeypatch.setattr(db, 'BUSY_TIMEOUT_MS', 50)
+    group_writer = writer.GroupCommitWriter(database, lock_wait=0.3)
+    holder = sqlite3.connect(database, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            group_writer.submit([insert_expense("never")]).result(timeout=5)
+    finally:
+        holder.execute("ROLLBACK")
+        group_writer.close()
+
+# Writes from other sessions commit while an import is under way, because
+# the importer holds the lock only while inserting one chunk
+def test_writes_commit_during_an_import(group_writer, conn, monkeypatch):
+    monkeypatch.setattr(db, 'BUSY_TIMEOUT_MS', 200)
+    committed = []
+
+    def records():
+        for index, (amount, category, day, description) in enumerate(daily_expenses(date(2020, 1, 1),
+                                                                                    date(2024, 1, 1))):
+            if index % 500 == 250:
+                committed.append(group_writer.submit([insert_expense(f"during {index}")]).result(timeout=5))
+            yield day.isoformat(), str(amount), category, description
+
+    with db.connection() as import_conn:
+        stats = importer.import_expenses(import_conn, 'alice', records(), chunk_size=200)
+    assert stats.rows_imported == len(daily_expenses(date(2020, 1, 1), date(2024, 1, 1)))
+    assert len(committed) == 3
+    assert conn.execute("SELECT COUNT(*) FROM expense_rows WHERE description LIKE 'during %'").fetchone()[0] == 3
+
+def test_page_writes_go_through_the_process_writer(conn):
+    try:
+        assert writer.get_writer() is writer.get_writer()
+        writer.add_category('alice', 'Travel').result(timeout=5)
+        writer.set_goal('alice', 2024, 5, 300).result(timeout=5)
+        writer.set_goal('alice', 2024, 5, 250).result(timeout=5)
+    finally:
+        writer.close()
+    assert 'Travel' in db.get_categories(conn, 'alice')
+    assert db.get_goal(conn, 'alice', 2024, 5) == 250
@@ -0,0 +1,63 @@
+import sqlite3
+from datetime import date
+
+import streamlit as st
+
+import db
+import writer
+
+# Add Expense page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['add_expense_icon']} Add Expense")
+    categories = cached.get(db.get_categories)
+    if not categories:
+        st.warning("No categories found. Please add categories first.")
+        return
+
+    amount = st.number_input("Amount", min_value=0.0, step=0.01, key="expense_amount")
+    category = st.selectbox("Category", categories, key="expense_category")
+    date_input = st.date_input("Date", value=date.today(), key="expense_date")
+    description = st.text_input("Description", key="expense_description")
+    check_wishlist = st.checkbox("Check Wishlist", key="expense_wishlist_check")
+
+    # Queue the insert (and wishlist update) and wait for its group commit
+    def save_expense(message, wishlist_id=None):
+        try:
+            writer.add_expense(username, amount, category, date_input, description,
+                               wishlist_id).result(timeout=writer.RESULT_TIMEOUT)
+        except (sqlite3.Error, TimeoutError) as error:
+            st.error(f"Could not save the expense: {error}")
+            return
+        cached.refresh()
+        st.success(message)
+
+    if st.button("Add Expense", key="add_expense_submit_button"):
+        st.session_state.pop('wishlist_candidate', None)
+        if check_wishlist and description:
+            match = db.match_wishlist(conn, username, description)
+            if match is None:
+                st.warning("This item is not on your wishlist. Are you sure you want to add it?")
+                if st.button("Confirm Add", key="confirm_add_expense_button"):
+                    save_expense("Expense added!")
+            elif match[2]:
+                save_expense(f"Expense added and wishlist item '{match[1]}' marked as purchased!", match[0])
+            else:
+                # A near match is only a guess, so the user decides
+                st.session_state.wishlist_candidate = match
+        elif description:
+            save_expense("Expense added!")
+        else:
+            st.error("Please enter a description.")
+
+    candidate = st.session_state.get('wishlist_candidate')
+    if candidate:
+        st.info(f"Did you buy '{candidate[1]}' from your wishlist?")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Yes, mark it purchased", key="confirm_wishlist_match_button"):
+                del st.session_state.wishlist_candidate
+                save_expense(f"Expense added and wishlist item '{candidate[1]}' marked as purchased!", candidate[0])
+        with col2:
+            if st.button("No, just add the expense", key="reject_wishlist_match_button"):
+                del st.session_state.wishlist_candidate
+                save_expense("Expense added!")
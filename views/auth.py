@@ -0,0 +1,35 @@
+import streamlit as st
+
+import db
+
+# Login page
+def render_login(ASSET_PATHS):
+    st.markdown(f'<div style="font-size:2em; margin-bottom:20px;">{ASSET_PATHS["login_bg"]}</div>', unsafe_allow_html=True)
+    st.header("Login")
+    username = st.text_input("Username", key="login_username")
+    password = st.text_input("Password", type="password", key="login_password")
+    if st.button("Login", key="login_submit_button"):
+        if db.authenticate(username, password):
+            st.session_state.logged_in = True
+            st.session_state.username = username
+            st.session_state.page = "Dashboard"
+            st.success("Logged in successfully!")
+            st.rerun()
+        else:
+            st.error("Invalid username or password")
+
+# Sign Up page
+def render_signup(ASSET_PATHS):
+    st.markdown(f'<div style="font-size:2em; margin-bottom:20px;">{ASSET_PATHS["signup_bg"]}</div>', unsafe_allow_html=True)
+    st.header("Sign Up")
+    username = st.text_input("Username", key="signup_username")
+    password = st.text_input("Password", type="password", key="signup_password")
+    name = st.text_input("Name", key="signup_name")
+    email = st.text_input("Email", key="signup_email")
+    if st.button("Sign Up", key="signup_submit_button"):
+        if db.add_user(username, password, name, email):
+            st.success("Account created! Please log in.")
+            st.session_state.page = "Login"
+            st.rerun()
+        else:
+            st.error("Username already exists")
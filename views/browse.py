@@ -0,0 +1,63 @@
+from datetime import date
+
+import streamlit as st
+
+import db
+
+PAGE_SIZE = 50
+
+# One page of expenses matching `filters` (keyword arguments for
+# db.browse_expenses), with Newer/Older buttons. Only the visible page is ever
+# fetched; the (date, id) keyset of each page start is kept in session state
+# under `key`, and is reset whenever the filters change.
+def expense_table(conn, username, filters, key):
+    if st.session_state.get(f"{key}_filters") != filters:
+        st.session_state[f"{key}_filters"] = filters
+        st.session_state[f"{key}_pages"] = [None]
+    pages = st.session_state[f"{key}_pages"]
+    rows = db.browse_expenses(conn, username, after=pages[-1], limit=PAGE_SIZE + 1, **filters)
+    has_older = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+    if not rows:
+        st.info("No expenses match these filters.")
+        return
+
+    st.dataframe({column: [row[i] for row in rows] for i, column in enumerate(db.BROWSE_COLUMNS) if column != 'id'},
+                 hide_index=True)
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(pages) > 1 and st.button("◀ Newer", key=f"{key}_newer_button"):
+            pages.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(pages)} · {PAGE_SIZE} per page")
+    with col3:
+        if has_older and st.button("Older ▶", key=f"{key}_older_button"):
+            pages.append((rows[-1][1], rows[-1][0]))
+            st.rerun()
+
+# Browse page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['browse_icon']} Browse Expenses")
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("From", value=None, key="browse_start_date")
+    with col2:
+        end_date = st.date_input("To", value=date.today(), key="browse_end_date")
+    categories = st.multiselect("Categories", cached.get(db.get_categories), key="browse_categories")
+    col1, col2 = st.columns(2)
+    with col1:
+        min_amount = st.number_input("Min Amount ($)", min_value=0.0, value=None, step=1.0, key="browse_min_amount")
+    with col2:
+        max_amount = st.number_input("Max Amount ($)", min_value=0.0, value=None, step=1.0, key="browse_max_amount")
+    text = st.text_input("Search descriptions", key="browse_text", placeholder="e.g. coffee, bike rep").strip()
+
+    filters = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'categories': tuple(categories),
+        'min_amount': min_amount,
+        'max_amount': max_amount,
+        'text': text or None,
+    }
+    expense_table(conn, username, filters, key="browse")
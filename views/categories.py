@@ -0,0 +1,30 @@
+import sqlite3
+
+import streamlit as st
+
+import db
+import writer
+
+# Categories page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['categories_icon']} Manage Categories")
+    new_category = st.text_input("New Category", key="category_input")
+    if st.button("Add Category", key="add_category_button"):
+        if new_category:
+            try:
+                writer.add_category(username, new_category).result(timeout=writer.RESULT_TIMEOUT)
+                cached.refresh()
+                st.success(f"Added category: {new_category}")
+            except sqlite3.IntegrityError:
+                st.error("Category already exists")
+            except (sqlite3.Error, TimeoutError) as error:
+                st.error(f"Could not add the category: {error}")
+        else:
+            st.error("Please enter a category name.")
+
+    categories = cached.get(db.get_categories)
+    if categories:
+        st.subheader("Current Categories:")
+        st.write(", ".join(categories))
+    else:
+        st.info("No categories added yet.")
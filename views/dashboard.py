@@ -0,0 +1,148 @@
+from datetime import date
+
+import numpy as np
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+
+import analytics
+import db
+import instrumentation
+
+# Dashboard page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['dashboard_icon']} Dashboard")
+    # Goal and Spending Section
+    st.subheader(f"{ASSET_PATHS['spending_icon']} Spending & Goal")
+    current_year, current_month = date.today().year, date.today().month
+    goal_amount = cached.get(db.get_goal, current_year, current_month)
+    total_expense = cached.get(db.month_total, current_year, current_month)
+
+    progress_color = "#4CAF50"  # Green for on track
+    progress_text = "✅ On track with your goal!"
+    progress_percent = 0.0
+    if goal_amount > 0:
+        progress_percent = min(total_expense / goal_amount, 1.0)
+        if progress_percent > 0.8:
+            progress_color = "#FF9800"  # Orange for nearing limit
+        if progress_percent > 1.0:
+            progress_color = "#F44336"  # Red for overspent
+            progress_text = "😔 You have overspent!"
+        st.metric("Monthly Spending", f"${total_expense:.2f} / ${goal_amount:.2f}",
+                    delta=f"{progress_percent*100:.1f}% of Goal")
+    else:
+        st.metric("Monthly Spending", f"${total_expense:.2f}", delta="No goal set")
+        st.warning("No goal set for this month.")
+
+    # Colorful progress bar using HTML
+    progress_bar_html = f"""
+        <div style="background-color:#f0f2f6; border-radius: 5px; height: 10px; width: 100%;">
+            <div style="background-color:{progress_color}; border-radius: 5px; height: 10px; width: {progress_percent * 100}%;"></div>
+        </div>
+        """
+    st.markdown(progress_bar_html, unsafe_allow_html=True)
+    st.markdown(f"<span style='color:{progress_color};'>{progress_text}</span>", unsafe_allow_html=True)
+
+    if goal_amount == 0 and st.button("Set Goal Now", key="dashboard_set_goal_button"):
+        st.session_state.page = "Set Goal"
+        st.rerun()
+
+    # Date picker for charts
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", value=date.today(), key="dashboard_start_date")
+    with col2:
+        end_date = st.date_input("End Date", value=date.today(), key="dashboard_end_date")
+
+    # Category totals for the range, from the user's history arrays
+    history = analytics.get_history(conn, username, cached.version)
+    start_day, end_day = db.day_numbers(start_date, end_date)
+    categories = history.categories
+    amounts = history.category_totals(start_day, end_day) / 100
+
+    # Bar Graph with category icons
+    st.subheader(f"{ASSET_PATHS['dashboard_icon']} Expenses by Categories")
+    icons = ASSET_PATHS['category_icons']
+    st.markdown("<br>".join(
+        f'<span style="font-size:16px; vertical-align:middle; margin-right:5px;">{icons.get(category, icons["Others"])}</span> '
+        f'{category}: ${amount:.2f}' for category, amount in zip(categories, amounts)), unsafe_allow_html=True)
+    with instrumentation.timer('chart', 'Dashboard: category bar'):
+        fig_bar = px.bar(x=categories, y=amounts, title="",
+                            color=categories, color_discrete_sequence=px.colors.qualitative.Plotly)
+        fig_bar.update_layout(showlegend=False, xaxis_title="Category", yaxis_title="Amount ($)")
+        st.plotly_chart(fig_bar)
+
+    # Pie Chart
+    st.subheader("Category Distribution")
+    spent = amounts > 0
+    if not spent.any():
+        st.info("No expenses recorded for this period. Add expenses to see distribution.")
+    else:
+        with instrumentation.timer('chart', 'Dashboard: category pie'):
+            fig_pie = px.pie(names=np.array(categories)[spent], values=amounts[spent], title="",
+                                color_discrete_sequence=px.colors.qualitative.Plotly)
+            st.plotly_chart(fig_pie)
+
+    # Additional Metrics
+    if spent.any():
+        highest, lowest = history.extremes(start_day, end_day)
+        st.write(f"**Highest Expense**: ${highest[0]:.2f} on {highest[1]} ({highest[2]})")
+        st.write(f"**Lowest Expense**: ${lowest[0]:.2f} on {lowest[1]} ({lowest[2]})")
+
+    render_trends(history, ASSET_PATHS)
+
+# Spending over the whole history, month-over-month and year-over-year changes
+# and goal attainment. Series are computed at full resolution and resampled
+# before charting, so multi-year daily charts stay within MAX_CHART_POINTS.
+def render_trends(history, ASSET_PATHS):
+    st.subheader(f"{ASSET_PATHS['reports_icon']} Trends")
+    if history.empty:
+        st.info("Add expenses to see how your spending changes over time.")
+        return
+
+    today = db.to_day(date.today())
+    this_month = int(analytics.as_dates(today).astype('datetime64[M]').astype(int))
+    months, monthly = history.monthly(min(history.months[0], this_month - 12), this_month + 1)
+    month_change, month_fraction = analytics.change(monthly, 1)
+    year_change, year_fraction = analytics.change(monthly, 12)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Month to Date", f"${monthly[-1] / 100:,.2f}")
+    col2.metric("vs Last Month", f"${monthly[-2] / 100:,.2f}",
+                delta=f"{month_fraction[-1]:+.1%}" if np.isfinite(month_fraction[-1]) else None, delta_color="inverse")
+    col3.metric("vs Same Month Last Year", f"${monthly[-13] / 100:,.2f}",
+                delta=f"{year_fraction[-1]:+.1%}" if np.isfinite(year_fraction[-1]) else None, delta_color="inverse")
+
+    resolution = st.radio("Resolution", ["Daily", "Weekly", "Monthly"], index=1, horizontal=True,
+                          key="dashboard_trend_resolution")
+    # Expenses entered ahead of time can start the history after today
+    first, end = min(int(history.days[0]), today), today + 1
+    if resolution == "Daily":
+        periods, cents = history.daily(first, end)
+        x = analytics.as_dates(periods)
+    elif resolution == "Weekly":
+        periods, cents = history.weekly(first, end)
+        x = analytics.as_dates(periods)
+    else:
+        periods, cents = history.monthly(min(int(history.months[0]), this_month), this_month + 1)
+        x = analytics.as_months(periods)
+    window = analytics.ROLLING_WINDOWS[resolution.lower()]
+    x, amounts, average = analytics.resample(x, cents / 100, analytics.rolling_mean(cents / 100, window))
+    with instrumentation.timer('chart', 'Dashboard: trend'):
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=x, y=amounts, name=f"{resolution} spending", mode='lines'))
+        fig.add_trace(go.Scatter(x=x, y=average, name=f"{window}-period average", mode='lines'))
+        fig.update_layout(xaxis_title="Date", yaxis_title="Amount ($)", hovermode='x unified')
+        st.plotly_chart(fig)
+
+    goal_months, goal_spent, goal_cents = history.goal_attainment()
+    if len(goal_months):
+        met = goal_spent <= goal_cents
+        st.caption(f"Stayed within the goal in {int(met.sum())} of {len(goal_months)} months with a goal")
+        with instrumentation.timer('chart', 'Dashboard: goal attainment'):
+            fig_goals = go.Figure()
+            fig_goals.add_trace(go.Bar(x=analytics.as_months(goal_months), y=goal_spent / 100, name="Spent",
+                                       marker_color=np.where(met, "#4CAF50", "#F44336")))
+            fig_goals.add_trace(go.Scatter(x=analytics.as_months(goal_months), y=goal_cents / 100, name="Goal",
+                                           mode='lines+markers'))
+            fig_goals.update_layout(xaxis_title="Month", yaxis_title="Amount ($)")
+            st.plotly_chart(fig_goals)
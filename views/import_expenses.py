@@ -0,0 +1,33 @@
+import streamlit as st
+
+import importer
+
+# Import page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['import_icon']} Import Expenses")
+    st.write("Upload a CSV with date, amount, category and description columns, or an OFX/QFX bank statement. "
+             "Missing categories are created automatically.")
+    uploaded = st.file_uploader("File", type=list(importer.PARSERS), key="import_file")
+    debits_only = st.checkbox("Only import debits (negative amounts)", key="import_debits_only")
+    decimal = st.radio("Amounts are written like", importer.DECIMAL_SEPARATORS, horizontal=True,
+                       format_func={'.': "1,234.56", ',': "1.234,56"}.get, key="import_decimal")
+    date_order = st.radio("Dates with slashes are written like", importer.DATE_ORDERS, horizontal=True,
+                          format_func={'auto': "Reject ambiguous ones", 'mdy': "MM/DD/YYYY",
+                                       'dmy': "DD/MM/YYYY"}.get, key="import_date_order")
+    if uploaded is not None and st.button("Import", key="import_submit_button"):
+        progress = st.empty()
+        try:
+            stats = importer.import_file(
+                conn, username, uploaded, uploaded.name.rsplit('.', 1)[-1].lower(), debits_only=debits_only,
+                decimal=decimal, date_order=date_order,
+                on_progress=lambda s: progress.write(f"Imported {s.rows_imported:,} rows "
+                                                     f"({s.rows_per_second:,.0f} rows/s)...")
+            )
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            cached.refresh()
+            progress.empty()
+            st.success(stats.summary())
+            if stats.errors:
+                st.warning("Some rows were skipped:\n\n" + "\n".join(f"- {error}" for error in stats.errors))
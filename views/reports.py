@@ -0,0 +1,120 @@
+import calendar
+from datetime import date
+from functools import partial
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+import db
+import export
+import reports
+import instrumentation
+from views.browse import expense_table
+
+# Polls a background report build without blocking the page, then reruns the
+# app once so the download button replaces the progress message
+@st.fragment(run_every=1)
+def wait_for_report(future):
+    if future.done():
+        st.rerun()
+    st.info("⏳ Building report...")
+
+# Reports page
+def render(conn, username, cached, ASSET_PATHS):
+    st.markdown(f'<div style="font-size:1.5em; margin-bottom:20px;">{ASSET_PATHS["reports_header"]}</div>', unsafe_allow_html=True)
+    st.header("Reports")
+    st.subheader(f"{ASSET_PATHS['spending_icon']} Spending & Goal Summary")
+    current_year, current_month = date.today().year, date.today().month
+    goal_amount = cached.get(db.get_goal, current_year, current_month)
+    total_expense = cached.get(db.month_total, current_year, current_month)
+
+    progress_color_report = "#4CAF50"  # Default green
+    spending_status_report = "within budget"
+    if goal_amount > 0:
+        progress_report = total_expense / goal_amount
+        if progress_report > 0.8:
+            progress_color_report = "#FF9800"
+            spending_status_report = "nearing limit"
+        if progress_report > 1.0:
+            progress_color_report = "#F44336"
+            spending_status_report = "overspent"
+
+    if goal_amount > 0:
+        st.metric("Monthly Spending", f"${total_expense:.2f} / ${goal_amount:.2f}",
+                    delta=f"{progress_report*100:.1f}% of Goal")
+        st.markdown(f"<span style='color:{progress_color_report};'>Spending status: {spending_status_report.capitalize()}</span>", unsafe_allow_html=True)
+    else:
+        st.metric("Monthly Spending", f"${total_expense:.2f}", delta="No goal set")
+        st.warning("No goal set for this month.")
+
+    st.subheader("Expense Breakdown")
+    category_summary = pd.DataFrame(cached.get(db.month_category_totals, current_year, current_month),
+                                    columns=['category', 'amount'])
+    if not category_summary.empty:
+        with instrumentation.timer('chart', 'Reports: category bar'):
+            fig_bar = px.bar(category_summary, x='category', y='amount', title="Expenses by Category",
+                                color='category', color_discrete_sequence=px.colors.qualitative.Plotly)
+            st.plotly_chart(fig_bar)
+    else:
+        st.info("No expenses recorded for this month.")
+
+    st.subheader("All Expenses")
+    if not category_summary.empty:
+        month_start = date(current_year, current_month, 1)
+        month_end = date(current_year, current_month, calendar.monthrange(current_year, current_month)[1])
+        expense_table(conn, username, {'start_date': month_start, 'end_date': month_end}, key="reports_expenses")
+        st.download_button("Download CSV", partial(export.export_file, username, month_start, month_end),
+                           "expenses.csv", "text/csv", key="download_csv_button")
+    else:
+        st.info("No expenses recorded yet.")
+
+    # PDF reports are built in the background and cached per data version
+    st.subheader("PDF Report")
+    report_type = st.radio("Period", ["Month", "Year", "Custom range"], horizontal=True, key="report_type")
+    if report_type == "Custom range":
+        col1, col2 = st.columns(2)
+        with col1:
+            report_start = st.date_input("From", value=date(current_year, current_month, 1), key="report_start_date")
+        with col2:
+            report_end = st.date_input("To", value=date.today(), key="report_end_date")
+        period = reports.ReportPeriod.between(report_start, report_end)
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            report_year = st.number_input("Year", min_value=2000, max_value=2100, value=current_year,
+                                          key="report_year")
+        if report_type == "Month":
+            with col2:
+                report_month = st.selectbox("Month", range(1, 13), index=current_month - 1, key="report_month")
+            period = reports.ReportPeriod.month(int(report_year), report_month)
+        else:
+            period = reports.ReportPeriod.year(int(report_year))
+    if st.button("Generate PDF", key="generate_pdf_button"):
+        st.session_state.report_job = (period.filename, reports.submit_report(username, period, cached.version))
+    if 'report_job' in st.session_state:
+        filename, future = st.session_state.report_job
+        if not future.done():
+            wait_for_report(future)
+        elif future.exception() is not None:
+            st.error(f"Report failed: {future.exception()}")
+        else:
+            st.download_button("Download PDF", future.result(), filename, "application/pdf",
+                               key="download_pdf_button")
+
+    # Full-history export, built when the download is clicked
+    st.subheader("Export History")
+    all_history = st.checkbox("All history", value=True, key="export_all_history")
+    col1, col2 = st.columns(2)
+    with col1:
+        export_start = st.date_input("From", value=date(current_year, 1, 1), key="export_start_date",
+                                     disabled=all_history)
+    with col2:
+        export_end = st.date_input("To", value=date.today(), key="export_end_date", disabled=all_history)
+    export_format = st.selectbox("Format", export.available_formats(), key="export_format")
+    if all_history:
+        export_start = export_end = None
+    st.download_button("Download Export",
+                       partial(export.export_file, username, export_start, export_end, export_format),
+                       export.export_filename(username, export_start, export_end, export_format),
+                       export.FORMATS[export_format][1], key="download_export_button")
@@ -0,0 +1,24 @@
+import sqlite3
+from datetime import date
+
+import streamlit as st
+
+import writer
+
+# Set Goal page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['set_goal_icon']} Set Monthly Goal")
+    year = st.number_input("Year", min_value=2020, max_value=2100, value=date.today().year, key="goal_year")
+    month = st.selectbox("Month", range(1, 13), index=date.today().month-1, key="goal_month")
+    goal_amount = st.number_input("Goal Amount ($)", min_value=0.0, step=10.0, key="goal_amount")
+    if st.button("Set Goal", key="set_goal_submit_button"):
+        if goal_amount > 0:
+            try:
+                writer.set_goal(username, year, month, goal_amount).result(timeout=writer.RESULT_TIMEOUT)
+            except (sqlite3.Error, TimeoutError) as error:
+                st.error(f"Could not set the goal: {error}")
+            else:
+                cached.refresh()
+                st.success(f"Goal set: ${goal_amount} for {month}/{year}")
+        else:
+            st.error("Please enter a valid goal amount.")
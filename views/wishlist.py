@@ -0,0 +1,31 @@
+import sqlite3
+
+import streamlit as st
+
+import db
+import writer
+
+# Wishlist page
+def render(conn, username, cached, ASSET_PATHS):
+    st.header(f"{ASSET_PATHS['wishlist_icon']} Wishlist")
+    item = st.text_input("Add Item to Wishlist", key="wishlist_item")
+    if st.button("Add to Wishlist", key="add_wishlist_button"):
+        if item:
+            try:
+                writer.add_wishlist_item(username, item).result(timeout=writer.RESULT_TIMEOUT)
+            except (sqlite3.Error, TimeoutError) as error:
+                st.error(f"Could not add {item}: {error}")
+            else:
+                cached.refresh()
+                st.success(f"Added {item} to wishlist")
+        else:
+            st.error("Please enter an item name.")
+
+    wishlist = cached.get(db.get_wishlist)
+    if wishlist:
+        st.subheader("Your Wishlist:")
+        for item, purchased in wishlist:
+            status = "✅ Purchased" if purchased else "⬜ Pending"
+            st.write(f"- {item} ({status})")
+    else:
+        st.info("Your wishlist is empty.")
@@ -0,0 +1,171 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import db
+
+MAX_BATCH = 256         # writes committed together at most
+MAX_WAIT_MS = 0         # how long a group stays open for more writes; 0 takes what is queued
+RESULT_TIMEOUT = 30     # seconds a page waits for its write to be committed
+LOCK_WAIT = 20          # seconds a group keeps retrying for the write lock
+
+_STOP = object()
+
+# Single background thread that owns the only writing connection. Writes from
+# every session are queued; the thread takes whatever is waiting (up to
+# max_batch, holding the group open for max_wait seconds) and commits it as one
+# transaction. Each write runs in its own savepoint, so a failing write is
+# rolled back on its own and the rest of the group still commits. Other
+# connections (imports, the archiver) also write; while one holds the lock,
+# the group waits for it for up to lock_wait seconds rather than failing.
+class GroupCommitWriter:
+    def __init__(self, path=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000, lock_wait=LOCK_WAIT):
+        self.path = path or db.DB_PATH
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.lock_wait = lock_wait
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='writer', daemon=True)
+        self._thread.start()
+
+    # Queue a write, a list of (sql, params) statements applied atomically.
+    # Returns a Future that resolves, once the group is committed, to the
+    # lastrowid of the first statement, or raises the write's error.
+    def submit(self, statements):
+        future = Future()
+        self._queue.put((statements, future))
+        return future
+
+    # Commit everything queued so far and stop the thread
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        conn = db.connect(self.path)
+        conn.isolation_level = None
+        try:
+            while True:
+                batch, stopping = self._collect()
+                if batch:
+                    self._commit(conn, batch)
+                if stopping:
+                    return
+        finally:
+            conn.close()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    # BEGIN IMMEDIATE waits busy_timeout for the lock on each attempt
+    def _begin(self, conn):
+        deadline = time.monotonic() + self.lock_wait
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as error:
+                if 'database is locked' not in str(error) or time.monotonic() >= deadline:
+                    raise
+
+    def _commit(self, conn, batch):
+        results = []
+        try:
+            self._begin(conn)
+            for statements, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    rowid = None
+                    for index, (sql, params) in enumerate(statements):
+                        cursor = conn.execute(sql, params)
+                        if index == 0:
+                            rowid = cursor.lastrowid
+                    conn.execute("RELEASE write")
+                    results.append((future, rowid, None))
+                except Exception as error:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    results.append((future, None, error))
+            conn.execute("COMMIT")
+        except Exception as error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for statements, future in batch:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for future, rowid, error in results:
+            if error is None:
+                future.set_result(rowid)
+            else:
+                future.set_exception(error)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+# The process-wide writer for db.DB_PATH, restarted if db.use_database() has
+# pointed the process at another file
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.path != db.DB_PATH:
+            if _writer is not None:
+                _writer.close()
+            _writer = GroupCommitWriter(db.DB_PATH)
+        return _writer
+
+@atexit.register
+def close():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+# Writes made by the pages. Each returns a Future; call .result() to wait for
+# the commit.
+def add_expense(username, amount, category, day, description, wishlist_id=None):
+    statements = [(db.INSERT_EXPENSE, db.expense_params(username, amount, category, day, description))]
+    if wishlist_id is not None:
+        statements.append(("UPDATE wishlist SET purchased = 1 WHERE id = ? AND username = ?",
+                           (wishlist_id, username)))
+    return get_writer().submit(statements)
+
+def add_wishlist_item(username, item):
+    return get_writer().submit([("INSERT INTO wishlist (username, item, purchased) VALUES (?, ?, 0)",
+                                 (username, item))])
+
+# Fails with sqlite3.IntegrityError if the user already has the category
+def add_category(username, category):
+    return get_writer().submit([("INSERT INTO categories (username, category) VALUES (?, ?)",
+                                 (username, category))])
+
+def set_goal(username, year, month, goal_amount):
+    return get_writer().submit([("INSERT INTO goals (username, year, month, goal_amount) VALUES (?, ?, ?, ?) "
+                                 "ON CONFLICT (username, year, month) DO UPDATE SET goal_amount = excluded.goal_amount",
+                                 (username, year, month, goal_amount))])